@@ -1,14 +1,19 @@
 # scrape_betalist.py
 # Downloads ALL 31,000+ startups ever listed on BetaList.com (2013–2025)
 import requests
-from bs4 import BeautifulSoup
 import json
+import os
+import sys
 import time
 import threading
 from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+# The retry layer is shared with the other scrapers at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper_retry import HostBreakers, RetryBudget, RetryPolicy, get_with_retries
 
 BASE = "https://betalist.com"
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; BetaListArchive/1.0)"}
@@ -16,7 +21,6 @@ HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; BetaListArchive/1.0)"}
 # Configuration
 MAX_WORKERS = 8  # Concurrent requests for faster scraping
 REQUEST_DELAY = 0.9  # Polite delay between batches
-RETRY_LIMIT = 3
 OUTPUT_FILE = "betalist_all.jsonl"
 
 # Thread-safe collections
@@ -27,21 +31,19 @@ all_startups = []
 
 thread_local = threading.local()
 
+# Retry budget and per-host circuit breakers (see scraper_retry.py)
+retry_budget = RetryBudget()
+retry_policy = RetryPolicy(retry_budget)
+breakers = HostBreakers()
+
 
 def build_session():
-    """Create a session with retry logic and connection pooling"""
+    """Create a session with connection pooling (retries are handled by get_with_retries)"""
     session = getattr(thread_local, "session", None)
     if session is None:
         session = requests.Session()
-        retry = Retry(
-            total=RETRY_LIMIT,
-            read=RETRY_LIMIT,
-            connect=RETRY_LIMIT,
-            backoff_factor=0.3,
-            status_forcelist=(429, 500, 502, 503, 504),
-        )
         adapter = HTTPAdapter(
-            max_retries=retry,
+            max_retries=0,
             pool_connections=MAX_WORKERS * 2,
             pool_maxsize=MAX_WORKERS * 4,
         )
@@ -51,6 +53,96 @@ def build_session():
     return session
 
 
+class ListingParser(HTMLParser):
+    """
+    Single streaming pass over a listing page. Tracks the last date header
+    seen inside the startup grid and records each startup card as soon as it
+    closes, as (href, title, tagline, date). Open elements are matched to
+    their end tags by per-tag depth, the way BeautifulSoup nests them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.depths = {}
+        self.grid = None  # (tag, depth) of the startup grid while inside it
+        self.grid_found = False
+        self.header = None  # (tag, depth, text pieces) of an open date header
+        self.card = None  # open startup card
+        self.anchor = None  # (depth, fields, text pieces) of an open title and/or tagline link
+        self.current_date = ""
+        self.cards = []
+
+    def handle_starttag(self, tag, attrs):
+        depth = self.depths.get(tag, 0) + 1
+        self.depths[tag] = depth
+        attrs = dict(attrs)
+        classes = attrs.get("class") or ""
+
+        # Only the first grid counts, like soup.select_one()
+        if not self.grid_found and (
+            "startupGrid" in classes.split() or attrs.get("data-infinite-scroll-target") == "entries"
+        ):
+            self.grid_found = True
+            self.grid = (tag, depth)
+        if self.grid and self.header is None and "col-span-full" in classes and "text-3xl" in classes:
+            self.header = (tag, depth, [])
+
+        if tag == "div" and self.card is None and (attrs.get("id") or "").startswith("startup-"):
+            # Cards outside the grid get no date
+            self.card = {
+                "depth": depth,
+                "href": None,
+                "title": None,
+                "tagline": None,
+                "date": self.current_date if self.grid else "",
+            }
+        elif tag == "a" and self.card is not None:
+            href = attrs.get("href") or ""
+            if self.card["href"] is None and href.startswith("/startups/"):
+                self.card["href"] = href
+            if self.anchor is None:
+                # First link with each class holds the title / tagline
+                fields = [
+                    field
+                    for field, marker in (("title", "font-medium"), ("tagline", "text-gray-500"))
+                    if self.card[field] is None and marker in classes
+                ]
+                if fields:
+                    self.anchor = (depth, fields, [])
+
+    def handle_endtag(self, tag):
+        depth = self.depths.get(tag, 0)
+        if not depth:
+            return
+        self.depths[tag] = depth - 1
+        if self.anchor and tag == "a" and depth == self.anchor[0]:
+            for field in self.anchor[1]:
+                self.card[field] = "".join(self.anchor[2])
+            self.anchor = None
+        if self.header and tag == self.header[0] and depth == self.header[1]:
+            date_text = "".join(self.header[2])
+            if date_text:
+                self.current_date = date_text
+            self.header = None
+        if self.card and tag == "div" and depth == self.card["depth"]:
+            if self.card["href"]:
+                self.cards.append((self.card["href"], self.card["title"], self.card["tagline"], self.card["date"]))
+            self.card = None
+            self.anchor = None
+        if self.grid and (tag, depth) == self.grid:
+            self.grid = None
+
+    def handle_data(self, data):
+        # Same text as get_text(strip=True)
+        text = data.strip()
+        if not text:
+            return
+        if self.header:
+            self.header[2].append(text)
+        if self.anchor:
+            self.anchor[2].append(text)
+
+
 def scrape_page(page_num):
     """Scrape a single page and return startups found"""
     session = build_session()
@@ -61,86 +153,37 @@ def scrape_page(page_num):
         url = f"{BASE}/?page={page_num}"
     
     try:
-        r = session.get(url, timeout=15)
+        r = get_with_retries(session, url, retry_policy, breakers)
         if r.status_code != 200:
             return page_num, 0, []
         
-        soup = BeautifulSoup(r.text, 'html.parser')
-        
-        # Find all startup divs - they have id="startup-{id}"
-        startup_divs = soup.find_all("div", id=lambda x: x and x.startswith("startup-"))
-        
-        if not startup_divs:
-            return page_num, 0, []
-        
-        # Build a map of dates by finding date headers and associating them with following startups
-        date_headers = soup.find_all("div", class_=lambda x: x and "col-span-full" in str(x) and "text-3xl" in str(x))
-        startup_date_map = {}
-        current_date = ""
-        
-        # Find the startup grid container
-        startup_grid = soup.select_one(".startupGrid, [data-infinite-scroll-target='entries']")
-        if startup_grid:
-            # Process all children to track dates
-            for element in startup_grid.find_all(True):
-                classes = element.get('class', [])
-                class_str = ' '.join(classes) if classes else ''
-                
-                # Check if it's a date header
-                if 'col-span-full' in class_str and 'text-3xl' in class_str:
-                    date_text = element.get_text(strip=True)
-                    if date_text:
-                        current_date = date_text
-                # Check if it's a startup div
-                elif element.get('id', '').startswith('startup-'):
-                    if current_date:
-                        startup_date_map[element.get('id')] = current_date
+        # One pass over the markup instead of repeated soup searches
+        parser = ListingParser()
+        parser.feed(r.text)
+        parser.close()
         
         page_startups = []
-        for card in startup_divs:
-            try:
-                # Find the startup link
-                link = card.find("a", href=lambda x: x and x.startswith("/startups/"))
-                if not link:
+        for href, title_text, tagline_text, date_str in parser.cards:
+            slug = href.split("/")[-1]
+            
+            # Thread-safe duplicate check
+            with seen_lock:
+                if slug in seen_slugs:
                     continue
-                
-                slug = link["href"].split("/")[-1]
-                
-                # Thread-safe duplicate check
-                with seen_lock:
-                    if slug in seen_slugs:
-                        continue
-                    seen_slugs.add(slug)
-                
-                # Extract title - look for link with font-medium class
-                title_link = card.find("a", class_=lambda x: x and "font-medium" in str(x))
-                title_text = title_link.get_text(strip=True) if title_link else "No title"
-                
-                # Extract tagline - look for link with text-gray-500 class
-                tagline_link = card.find("a", class_=lambda x: x and "text-gray-500" in str(x))
-                tagline_text = tagline_link.get_text(strip=True) if tagline_link else ""
-                
-                # Get date from map
-                card_id = card.get('id', '')
-                date_str = startup_date_map.get(card_id, "")
-                
-                # Categories - may not be visible in this view
-                categories = []
-                
-                startup = {
-                    "slug": slug,
-                    "title": title_text,
-                    "tagline": tagline_text,
-                    "waitlist": 0,  # Not visible in main listing
-                    "founder": "unknown",  # Not visible in main listing
-                    "date": date_str,
-                    "categories": categories,
-                    "url": f"https://betalist.com{link['href']}",
-                    "scraped_at": datetime.now(timezone.utc).isoformat()
-                }
-                page_startups.append(startup)
-            except Exception:
-                continue
+                seen_slugs.add(slug)
+            
+            startup = {
+                "slug": slug,
+                "title": title_text if title_text is not None else "No title",
+                "tagline": tagline_text or "",
+                "waitlist": 0,  # Not visible in main listing
+                "founder": "unknown",  # Not visible in main listing
+                "date": date_str,
+                "categories": [],  # Not visible in main listing
+                "url": f"https://betalist.com{href}",
+                "scraped_at": datetime.now(timezone.utc).isoformat()
+            }
+            page_startups.append(startup)
         
         return page_num, len(page_startups), page_startups
     except Exception as e:
@@ -224,6 +267,7 @@ def main():
         pass
     
     print(f"\nSCRAPING COMPLETE! {total_in_file:,} startups saved → {OUTPUT_FILE}")
+    print(f"Retries: {retry_budget.describe()}, circuit breaker tripped {breakers.trips()} time(s)")
     print("Next → python analyze_betalist.py")
 
 
@@ -3,12 +3,17 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
+import sys
 import time
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+# The retry layer is shared with the other scrapers at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper_retry import HostBreakers, RetryBudget, RetryPolicy, get_with_retries
 
 BASE_URL = "https://dailypings.com"
 HEADERS = {
@@ -18,7 +23,6 @@ HEADERS = {
 # Configuration
 MAX_WORKERS = 5  # Concurrent page processing
 REQUEST_DELAY = 0.8  # Reduced delay for faster scraping
-RETRY_LIMIT = 3
 OUTPUT_FILE = "dailypings_all.jsonl"
 
 # Thread-safe collections
@@ -29,21 +33,19 @@ all_pings = []
 
 thread_local = threading.local()
 
+# Retry budget and per-host circuit breakers (see scraper_retry.py)
+retry_budget = RetryBudget()
+retry_policy = RetryPolicy(retry_budget)
+breakers = HostBreakers()
+
 
 def build_session():
-    """Create a session with retry logic and connection pooling"""
+    """Create a session with connection pooling (retries are handled by get_with_retries)"""
     session = getattr(thread_local, "session", None)
     if session is None:
         session = requests.Session()
-        retry = Retry(
-            total=RETRY_LIMIT,
-            read=RETRY_LIMIT,
-            connect=RETRY_LIMIT,
-            backoff_factor=0.3,
-            status_forcelist=(429, 500, 502, 503, 504),
-        )
         adapter = HTTPAdapter(
-            max_retries=retry,
+            max_retries=0,
             pool_connections=MAX_WORKERS * 2,
             pool_maxsize=MAX_WORKERS * 4,
         )
@@ -64,7 +66,7 @@ def scrape_page(page_num):
         url = f"{BASE_URL}?page={page_num}"
     
     try:
-        r = session.get(url, timeout=15)
+        r = get_with_retries(session, url, retry_policy, breakers)
         if r.status_code != 200:
             return None, 0
         
@@ -238,6 +240,7 @@ def main():
         pass
     
     print(f"\nSCRAPING COMPLETE! {total_in_file:,} pings saved to {OUTPUT_FILE}")
+    print(f"Retries: {retry_budget.describe()}, circuit breaker tripped {breakers.trips()} time(s)")
     print("Next: run python analyze_dailypings.py")
 
 
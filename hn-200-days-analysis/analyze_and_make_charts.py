@@ -2,13 +2,25 @@
 #
 # Load scraped Hacker News data (JSONL files) into DuckDB and export a set
 # of publication-ready charts using Plotly.
+#
+# Counts and averages are weighted by each record's sample_weight, so the
+# charts of a --sample crawl estimate the full crawl; records of a full
+# crawl have no weight and count once. The daily activity chart is the
+# exception: a sample only covers its drawn days, and a record's weight
+# stands for stories across the whole window, so it is skipped for samples.
 
+import argparse
 import os
+import time
+from typing import List
 
 import duckdb
 import pandas as pd
 import plotly.express as px
 
+from hn_sampling import SAMPLE_DIR
+from hn_segments import MANIFEST_FILE, SegmentManifest
+
 
 def save_figure(fig, name: str) -> None:
     try:
@@ -18,43 +30,77 @@ def save_figure(fig, name: str) -> None:
         print(f"Error saving {name}.png: {e}")
 
 
+def sql_file_list(files: List[str]) -> str:
+    return "[" + ", ".join("'" + name.replace("'", "''") + "'" for name in files) + "]"
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Chart the scraped Hacker News data.")
+    parser.add_argument("--days", type=int, help="only analyse items from the last N days")
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        help=f"analyse the stratified sample crawled into {SAMPLE_DIR}/ by scrape_hn_200_days.py --sample",
+    )
+    args = parser.parse_args()
     os.makedirs("charts", exist_ok=True)
 
+    directory = SAMPLE_DIR if args.sample else "."
+    source = sql_file_list([os.path.join(directory, "*.jsonl")])
+    window = ""
+    if args.days:
+        since = int(time.time()) - args.days * 86400
+        window = f"WHERE time >= {since}"
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            # Skip part files whose time range ends before the window.
+            manifest = SegmentManifest(directory)
+            files = manifest.select(since=since)
+            print(f"Reading {len(files)} of {len(manifest.segments)} part files listed in {MANIFEST_FILE}.")
+            if not files:
+                return
+            source = sql_file_list(files)
+
     con = duckdb.connect()
     print("Loading all data (this takes 10-30 seconds)...")
     # Load JSONL files with union_by_name to handle schema differences
-    con.execute("""
+    con.execute(f"""
         CREATE OR REPLACE TABLE hn AS 
-        SELECT * FROM read_json_auto('*.jsonl', union_by_name=true, ignore_errors=true)
+        SELECT * FROM read_json_auto({source}, union_by_name=true, ignore_errors=true)
+        {window}
     """)
+    # Full crawls carry no sample_weight: every record stands for itself.
+    con.execute("ALTER TABLE hn ADD COLUMN IF NOT EXISTS sample_weight DOUBLE")
+    con.execute("UPDATE hn SET sample_weight = 1 WHERE sample_weight IS NULL")
 
     print("Data loaded! Generating charts...")
 
-    df = con.execute(
-        """
-        SELECT
-            DATE_TRUNC('day', to_timestamp(time))::DATE AS day,
-            COUNT(*) FILTER (WHERE type='story') AS stories,
-            COUNT(*) FILTER (
-                WHERE type='comment'
-            ) AS comments
-        FROM hn
-        WHERE time IS NOT NULL
-        GROUP BY 1
-        ORDER BY 1
-        """
-    ).df()
-    if not df.empty and len(df) > 0:
-        fig = px.area(
-            df,
-            x="day",
-            y=["stories", "comments"],
-            title="HN Daily Activity – Last 200 Days",
-        )
-        save_figure(fig, "01_daily_activity")
+    if args.sample:
+        print("Skipping chart 01: a sample only covers its drawn days; chart daily activity from a full crawl")
     else:
-        print("Skipping chart 01: No time data available")
+        df = con.execute(
+            """
+            SELECT
+                DATE_TRUNC('day', to_timestamp(time))::DATE AS day,
+                SUM(sample_weight) FILTER (WHERE type='story') AS stories,
+                SUM(sample_weight) FILTER (
+                    WHERE type='comment'
+                ) AS comments
+            FROM hn
+            WHERE time IS NOT NULL
+            GROUP BY 1
+            ORDER BY 1
+            """
+        ).df()
+        if not df.empty and len(df) > 0:
+            fig = px.area(
+                df,
+                x="day",
+                y=["stories", "comments"],
+                title="HN Daily Activity – Last 200 Days",
+            )
+            save_figure(fig, "01_daily_activity")
+        else:
+            print("Skipping chart 01: No time data available")
 
     df = con.execute(
         """
@@ -64,8 +110,8 @@ def main() -> None:
                 AT TIME ZONE 'UTC'
                 AT TIME ZONE 'America/Los_Angeles'
             ) AS hour,
-            COUNT(*) AS n,
-            AVG(score) AS avg_score
+            SUM(sample_weight) AS n,
+            SUM(score * sample_weight) / SUM(sample_weight) AS avg_score
         FROM hn
         WHERE type='story' AND score > 10 AND time IS NOT NULL
         GROUP BY hour
@@ -113,14 +159,15 @@ def main() -> None:
         WITH words AS (
             SELECT
                 UNNEST(regexp_split_to_array(LOWER(title), '\\W+')) AS word,
-                score
+                score,
+                sample_weight
             FROM hn
             WHERE type='story' AND score > 50 AND title IS NOT NULL
         )
         SELECT
             word,
-            COUNT(*) AS freq,
-            AVG(score) AS avg_score
+            SUM(sample_weight) AS freq,
+            SUM(score * sample_weight) / SUM(sample_weight) AS avg_score
         FROM words
         WHERE LENGTH(word) > 4
             AND word NOT IN ('the','and','for','with','from','this','that','have','will','make','more','most','best','first')
@@ -182,7 +229,7 @@ def main() -> None:
                 WHEN score BETWEEN 101 AND 500 THEN '101-500'
                 ELSE '500+'
             END as score_range,
-            COUNT(*) as count
+            SUM(sample_weight) as count
         FROM hn
         WHERE type='story' AND score IS NOT NULL
         GROUP BY 1
@@ -216,8 +263,8 @@ def main() -> None:
                 WHEN url IS NULL OR url = '' THEN 'self-post'
                 ELSE 'other'
             END as domain,
-            COUNT(*) as stories,
-            AVG(score) as avg_score
+            SUM(sample_weight) as stories,
+            SUM(score * sample_weight) / SUM(sample_weight) as avg_score
         FROM hn
         WHERE type='story'
         GROUP BY 1
@@ -244,7 +291,7 @@ def main() -> None:
                 WHEN descendants BETWEEN 101 AND 500 THEN '101-500'
                 ELSE '500+'
             END as comment_range,
-            COUNT(*) as count
+            SUM(sample_weight) as count
         FROM hn
         WHERE type='story' AND descendants IS NOT NULL
         GROUP BY 1
@@ -284,8 +331,9 @@ def main() -> None:
         """
         SELECT
             EXTRACT(DOW FROM to_timestamp(time) AT TIME ZONE 'UTC' AT TIME ZONE 'America/Los_Angeles') as day_of_week,
-            COUNT(*) FILTER (WHERE type='story') as stories,
-            AVG(score) FILTER (WHERE type='story' AND score > 0) as avg_score
+            SUM(sample_weight) FILTER (WHERE type='story') as stories,
+            SUM(score * sample_weight) FILTER (WHERE type='story' AND score > 0)
+                / SUM(sample_weight) FILTER (WHERE type='story' AND score > 0) as avg_score
         FROM hn
         WHERE time IS NOT NULL AND type='story'
         GROUP BY 1
@@ -0,0 +1,130 @@
+"""
+Benchmark the HN crawler end to end against mock_hn_server.py.
+
+The mock site runs inside this process while scrape_hn_200_days.py runs as a
+child process in a scratch directory with --base-url pointing at it, so the
+crawler's CPU time and peak memory can be read from its resource usage
+without the server's own work mixed in. Arguments after "--" are passed to
+the crawler unchanged.
+
+    python benchmark_hn_crawl.py --days 5 --latency 0.05 -- --engine asyncio --parse-workers 4
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from mock_hn_server import MockHNServer, add_config_arguments, config_from_args
+
+CRAWLER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrape_hn_200_days.py")
+LOG_FILE = "crawl.log"
+
+
+def count_items(directory: str) -> Tuple[int, int]:
+    """Stories and total items across the part files written by the crawl."""
+    stories = items = 0
+    for name in os.listdir(directory):
+        if not (name.startswith("hn_html_part") and name.endswith(".jsonl")):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                items += 1
+                if '"type": "story"' in line:
+                    stories += 1
+    return stories, items
+
+
+def peak_rss_mb(usage: resource.struct_rusage) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / scale
+
+
+def run_benchmark(args: argparse.Namespace, crawler_args: List[str]) -> Dict:
+    server = MockHNServer(config_from_args(args)).start()
+    workdir = tempfile.mkdtemp(prefix="hn-bench-")
+    command = [
+        sys.executable,
+        CRAWLER,
+        "--base-url",
+        server.url,
+        "--days",
+        str(args.days),
+        "--fresh",
+        *crawler_args,
+    ]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    with open(os.path.join(workdir, LOG_FILE), "w", encoding="utf-8") as log:
+        returncode = subprocess.call(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    server.stop()
+
+    stories, items = count_items(workdir)
+    cpu_seconds = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    report = {
+        "command": command[1:],
+        "returncode": returncode,
+        "elapsed_seconds": round(elapsed, 2),
+        "stories": stories,
+        "items": items,
+        "items_per_second": round(items / elapsed, 1) if elapsed else None,
+        "cpu_seconds": round(cpu_seconds, 2),
+        "cpu_utilisation": round(cpu_seconds / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb(after), 1),
+        "server_responses": dict(sorted(server.served.items())),
+        "workdir": workdir,
+    }
+    if args.keep or returncode:
+        print(f"Crawl output kept in {workdir} (log: {LOG_FILE}).")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+        report["workdir"] = None
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"Crawler exit code:  {report['returncode']}")
+    print(f"Wall time:          {report['elapsed_seconds']:.2f}s")
+    print(f"Stories / items:    {report['stories']:,} / {report['items']:,}")
+    print(f"Throughput:         {report['items_per_second']:,} items/s")
+    print(f"CPU time:           {report['cpu_seconds']:.2f}s ({report['cpu_utilisation']:.2f} cores busy)")
+    print(f"Peak RSS:           {report['peak_rss_mb']:.1f} MB (largest crawler process)")
+    print(f"Server responses:   {report['server_responses']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure crawler throughput, CPU and memory against a local mock Hacker News.",
+        epilog='Arguments after "--" go to scrape_hn_200_days.py (e.g. -- --engine asyncio).',
+    )
+    parser.add_argument("--days", type=int, default=3, help="days of front pages to crawl")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory with the part files")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_config_arguments(parser)
+    argv = sys.argv[1:]
+    crawler_args: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, crawler_args = argv[:split], argv[split + 1 :]
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args, crawler_args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
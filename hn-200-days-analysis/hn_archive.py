@@ -0,0 +1,94 @@
+"""
+Compressed, content-addressed archive of every page the HN crawler fetches.
+
+Page bodies are gzip-compressed and stored once under the SHA-256 of their
+content (objects/ab/abcdef....html.gz). An append-only index records one
+line per fetch, keyed by URL and fetch time, together with what the page was
+(a front page for a given day, or an item page for a given story) so that
+reparse_hn_archive.py can rebuild the part files without touching the network.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Union
+
+ARCHIVE_DIR = "hn_archive"
+INDEX_FILE = "index.jsonl"
+
+Chunk = Union[str, bytes]
+
+
+class PageArchive:
+    """Thread-safe writer and reader for one archive directory."""
+
+    def __init__(self, directory: str = ARCHIVE_DIR) -> None:
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.html.gz")
+
+    def store(self, kind: str, url: str, body: Chunk, **meta: object) -> None:
+        for _ in self.tee(kind, url, [body], **meta):
+            pass
+
+    def tee(self, kind: str, url: str, chunks: Iterable[Chunk], **meta: object) -> Iterator[Chunk]:
+        """Pass chunks through unchanged while archiving them; commits once the stream is exhausted."""
+        fetched_at = time.time()
+        hasher = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, suffix=".tmp")
+        committed = False
+        try:
+            with gzip.GzipFile(fileobj=os.fdopen(fd, "wb"), mode="wb") as handle:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    hasher.update(data)
+                    handle.write(data)
+                    yield chunk
+            self._commit(temp_path, hasher.hexdigest(), kind, url, fetched_at, meta)
+            committed = True
+        finally:
+            if not committed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _commit(self, temp_path: str, digest: str, kind: str, url: str, fetched_at: float, meta: Dict) -> None:
+        final_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+        entry = {"url": url, "fetched_at": fetched_at, "sha256": digest, "kind": kind, **meta}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.index_path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+
+    def entries(self) -> List[Dict]:
+        """Index entries, keeping only the most recent fetch of each URL."""
+        latest: Dict[str, Dict] = {}
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                previous = latest.get(entry["url"])
+                if previous is None or entry["fetched_at"] >= previous["fetched_at"]:
+                    latest[entry["url"]] = entry
+        return list(latest.values())
+
+
+def read_object(path: str) -> str:
+    with gzip.open(path, "rb") as handle:
+        return handle.read().decode("utf-8", errors="replace")
+
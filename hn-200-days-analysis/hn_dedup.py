@@ -0,0 +1,77 @@
+"""
+Run-wide story deduplication for the HN crawler.
+
+A story that stays on the front page for several days shows up on every one
+of those `front?day=` pages. SeenStories remembers which story ids a run has
+already queued: a fixed-size Bloom filter answers the common "never seen"
+case from memory, and only its positives are confirmed against an on-disk
+SQLite set, so memory stays flat however many years the crawl covers and a
+false positive never drops a story. Since every story is queued at most once,
+no two fetches of the same thread are ever in flight.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Iterable, Optional
+
+SEEN_CAPACITY = 1_000_000
+SEEN_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = SEEN_CAPACITY, error_rate: float = SEEN_ERROR_RATE) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int) -> Iterable[int]:
+        digest = hashlib.blake2b(key.to_bytes(8, "little", signed=True), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, key: int) -> bool:
+        """Set the key's bits; returns True if they were all set already (i.e. possibly seen)."""
+        present = True
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & mask:
+                present = False
+                self.bits[byte] |= mask
+        return present
+
+
+class SeenStories:
+    """Thread-safe set of the story ids queued in this run."""
+
+    def __init__(self, capacity: int = SEEN_CAPACITY, directory: Optional[str] = None) -> None:
+        self.bloom = BloomFilter(capacity)
+        fd, self.path = tempfile.mkstemp(prefix="hn-seen-", suffix=".sqlite", dir=directory)
+        os.close(fd)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE seen (id INTEGER PRIMARY KEY)")
+        self.duplicates = 0
+
+    def add(self, story_id: int) -> bool:
+        """Record a story id; returns False if the run has already seen it."""
+        with self.lock:
+            if self.bloom.add(story_id):
+                row = self.conn.execute("SELECT 1 FROM seen WHERE id = ?", (story_id,)).fetchone()
+                if row:
+                    self.duplicates += 1
+                    return False
+            self.conn.execute("INSERT INTO seen (id) VALUES (?)", (story_id,))
+            return True
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+        os.remove(self.path)
+
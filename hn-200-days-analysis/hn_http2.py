@@ -0,0 +1,118 @@
+"""
+HTTP/2 transport for the HN crawler, built on httpx.
+
+Instead of a requests session (and its own connection pool) per fetch
+thread, every thread shares a few httpx clients, each multiplexing all of
+its requests over one HTTP/2 connection per host. Http2Session exposes the
+small part of the requests API the crawler uses and raises requests
+exceptions, so callers' error handling stays the same. Like the requests
+sessions it makes a single attempt per call; retries are the crawler's.
+"""
+
+import threading
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # Only needed for --transport http2 (pip install "httpx[http2]").
+    httpx = None
+
+
+def translate_errors(exc: Exception) -> requests.RequestException:
+    if isinstance(exc, httpx.TimeoutException):
+        return requests.Timeout(str(exc))
+    return requests.ConnectionError(str(exc))
+
+
+class Http2Response:
+    """requests.Response look-alike around an httpx response."""
+
+    def __init__(self, response: "httpx.Response") -> None:
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        # requests callers read response.raw.tell() for the bytes received.
+        self.raw = self
+
+    def tell(self) -> int:
+        return self.response.num_bytes_downloaded
+
+    def read(self) -> bytes:
+        """Load the body, which a streamed response has not read yet."""
+        try:
+            return self.response.read()
+        except httpx.HTTPError as exc:
+            raise translate_errors(exc) from exc
+
+    @property
+    def content(self) -> bytes:
+        return self.read()
+
+    @property
+    def text(self) -> str:
+        self.read()
+        return self.response.text
+
+    def iter_content(self, chunk_size: int, decode_unicode: bool = False) -> Iterator[Union[str, bytes]]:
+        chunks = self.response.iter_text(chunk_size) if decode_unicode else self.response.iter_bytes(chunk_size)
+        try:
+            yield from chunks
+        except httpx.HTTPError as exc:
+            raise translate_errors(exc) from exc
+
+    def close(self) -> None:
+        self.response.close()
+
+    def __enter__(self) -> "Http2Response":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class Http2Session:
+    """Thread-safe, requests-compatible GET over one pooled HTTP/2 httpx client."""
+
+    def __init__(self, headers: Dict[str, str], timeout: float) -> None:
+        if httpx is None:
+            raise RuntimeError('The http2 transport requires httpx with HTTP/2 support (pip install "httpx[http2]").')
+        transport = httpx.HTTPTransport(http2=True)
+        self.client = httpx.Client(transport=transport, headers=headers, timeout=timeout)
+        self.lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    def _trace(self, event_name: str, info: Dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self.lock:
+                self.connections_opened += 1
+
+    def connection_counts(self) -> Tuple[int, int]:
+        """(connections opened, requests sent) so far."""
+        with self.lock:
+            return self.connections_opened, self.requests_sent
+
+    def get(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> Http2Response:
+        extra = {"timeout": timeout} if timeout is not None else {}
+        request = self.client.build_request(
+            "GET", url, params=params, headers=headers, extensions={"trace": self._trace}, **extra
+        )
+        with self.lock:
+            self.requests_sent += 1
+        try:
+            return Http2Response(self.client.send(request, stream=stream))
+        except httpx.HTTPError as exc:
+            raise translate_errors(exc) from exc
+
+    def close(self) -> None:
+        self.client.close()
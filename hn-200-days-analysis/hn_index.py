@@ -0,0 +1,184 @@
+"""
+Byte-offset index over the HN part files, for random access by item ID.
+
+For every item the index (SQLite, next to the part files) keeps the part
+file, byte offset and length of its JSON line and the story whose thread it
+belongs to, and for every thread the span of its contiguous block of lines.
+Lookups memory-map the part file and decode only the lines asked for, so a
+story and its whole comment tree come back without scanning any part file.
+"""
+
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE = "hn_html_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    segment INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    story INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_segment ON items (segment);
+CREATE TABLE IF NOT EXISTS threads (
+    story INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_segment ON threads (segment);
+"""
+
+# (item id, story id, byte offset, length) for one line of a part file.
+IndexRow = Tuple[int, int, int, int]
+
+
+def scan_part_file(filename: str) -> List[IndexRow]:
+    """Index rows for an existing part file; each story line opens its thread's block."""
+    rows: List[IndexRow] = []
+    story_id: Optional[int] = None
+    start = 0
+    with open(filename, "rb") as handle:
+        for line in handle:
+            if line.strip():
+                item = json.loads(line)
+                if item.get("type") == "story":
+                    story_id = item["id"]
+                rows.append((item["id"], story_id if story_id is not None else item["id"], start, len(line)))
+            start += len(line)
+    return rows
+
+
+class PartIndex:
+    """Thread-safe reader and writer of one directory's offset index."""
+
+    def __init__(self, directory: str = ".") -> None:
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.maps: Dict[int, mmap.mmap] = {}
+
+    def add_segment(self, filename: str, rows: Iterable[IndexRow]) -> None:
+        """Index a freshly written part file, replacing whatever the index held for that file."""
+        stat = os.stat(filename)
+        spans: Dict[int, List[int]] = {}
+        items = []
+        for item_id, story_id, start, length in rows:
+            items.append((item_id, start, length, story_id))
+            span = spans.get(story_id)
+            if span is None:
+                spans[story_id] = [start, start + length]
+            else:
+                span[0] = min(span[0], start)
+                span[1] = max(span[1], start + length)
+        with self.lock, self.conn:
+            self._drop(os.path.basename(filename))
+            segment = self.conn.execute(
+                "INSERT INTO segments (file, size, mtime_ns) VALUES (?, ?, ?)",
+                (os.path.basename(filename), stat.st_size, stat.st_mtime_ns),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO items (id, segment, start, length, story) VALUES (?, ?, ?, ?, ?)",
+                [(item_id, segment, start, length, story_id) for item_id, start, length, story_id in items],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO threads (story, segment, start, length) VALUES (?, ?, ?, ?)",
+                [(story_id, segment, start, end - start) for story_id, (start, end) in spans.items()],
+            )
+
+    def sync(self, filenames: List[str]) -> None:
+        """Index part files that are new or changed since they were indexed, and forget vanished ones."""
+        with self.lock:
+            known = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in self.conn.execute("SELECT file, size, mtime_ns FROM segments")
+            }
+        names = {os.path.basename(filename): filename for filename in filenames}
+        stale = [name for name in known if name not in names]
+        if stale:
+            with self.lock, self.conn:
+                for name in stale:
+                    self._drop(name)
+        for name, filename in names.items():
+            stat = os.stat(filename)
+            if known.get(name) != (stat.st_size, stat.st_mtime_ns):
+                self.add_segment(filename, scan_part_file(filename))
+
+    def _drop(self, name: str) -> None:
+        row = self.conn.execute("SELECT segment FROM segments WHERE file = ?", (name,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM items WHERE segment = ?", row)
+            self.conn.execute("DELETE FROM threads WHERE segment = ?", row)
+            self.conn.execute("DELETE FROM segments WHERE segment = ?", row)
+
+    def _read(self, segment: int, start: int, length: int) -> bytes:
+        with self.lock:
+            mapped = self.maps.get(segment)
+            if mapped is None:
+                name = self.conn.execute("SELECT file FROM segments WHERE segment = ?", (segment,)).fetchone()[0]
+                with open(os.path.join(self.directory, name), "rb") as handle:
+                    mapped = self.maps[segment] = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped[start : start + length]
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        """The stored JSON object for one item, or None if no part file holds it."""
+        with self.lock:
+            row = self.conn.execute("SELECT segment, start, length FROM items WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(self._read(*row)) if row else None
+
+    def thread(self, story_id: int) -> List[Dict]:
+        """A story followed by every comment in its thread, in part-file order."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT segment, start, length FROM threads WHERE story = ?", (story_id,)
+            ).fetchone()
+        if not row:
+            return []
+        # One json.loads over the whole block is about twice as fast as one per line.
+        lines = [line for line in self._read(*row).splitlines() if line.strip()]
+        return json.loads(b"[" + b",".join(lines) + b"]")
+
+    def subtree(self, item_id: int) -> List[Dict]:
+        """An item followed by all of its descendants (for a story, its whole thread)."""
+        with self.lock:
+            row = self.conn.execute("SELECT story FROM items WHERE id = ?", (item_id,)).fetchone()
+        if not row:
+            return []
+        items = self.thread(row[0])
+        if item_id == row[0]:
+            return items
+        children: DefaultDict[int, List[Dict]] = defaultdict(list)
+        root = None
+        for item in items:
+            if item["id"] == item_id:
+                root = item
+            elif item.get("type") == "comment":
+                children[item["parent"]].append(item)
+        if root is None:
+            return []
+        found = [root]
+        for item in found:
+            found.extend(children.get(item["id"], ()))
+        return found
+
+    def close(self) -> None:
+        with self.lock:
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+            self.conn.close()
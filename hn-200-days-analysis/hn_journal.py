@@ -0,0 +1,208 @@
+"""
+Durable crawl journal for the HN scraper, stored in SQLite.
+
+The journal records every part file that has been written, which story
+threads each file contains, and which days have all of their stories on
+disk. An interrupted crawl can therefore restart where it stopped instead
+of re-fetching finished days and overwriting earlier part files.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+JOURNAL_FILE = "hn_crawl_journal.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL,
+    stories INTEGER NOT NULL,
+    completed_at REAL
+);
+CREATE TABLE IF NOT EXISTS day_stories (
+    day TEXT NOT NULL,
+    story_id INTEGER NOT NULL,
+    PRIMARY KEY (day, story_id)
+);
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    batch INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    batch INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    flushed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS validators (
+    story_id INTEGER PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+Validators = Tuple[Optional[str], Optional[str]]
+
+
+class CrawlJournal:
+    """Thread-safe wrapper around the journal database."""
+
+    def __init__(self, path: str = JOURNAL_FILE, fresh: bool = False) -> None:
+        if fresh:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self.pending_validators: Dict[int, Validators] = {}
+
+    def day_completed(self, day: str) -> bool:
+        with self.lock:
+            row = self.conn.execute("SELECT completed_at FROM days WHERE day = ?", (day,)).fetchone()
+        return bool(row and row[0] is not None)
+
+    def register_day(self, day: str, pages: int, story_ids: List[int]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO days (day, pages, stories, completed_at) VALUES (?, ?, ?, NULL)",
+                (day, pages, len(story_ids)),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO day_stories (day, story_id) VALUES (?, ?)",
+                [(day, story_id) for story_id in story_ids],
+            )
+            self._complete_days()
+
+    def fetched_stories(self, story_ids: Iterable[int]) -> Set[int]:
+        ids = list(story_ids)
+        found: Set[int] = set()
+        with self.lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(f"SELECT id FROM stories WHERE id IN ({placeholders})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def next_batch_number(self) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(batch) FROM batches").fetchone()
+        return (row[0] or 0) + 1
+
+    def saved_items(self) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT SUM(items) FROM batches").fetchone()
+        return row[0] or 0
+
+    def remember_validators(self, story_id: int, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Hold a thread's ETag/Last-Modified until the thread's part file is journalled."""
+        if etag or last_modified:
+            with self.lock:
+                self.pending_validators[story_id] = (etag, last_modified)
+
+    def validators(self, story_id: int) -> Optional[Validators]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM validators WHERE story_id = ?", (story_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def record_batch(self, batch_num: int, filename: str, payload: List) -> None:
+        """Mark a flushed part file and every story thread it contains as done."""
+        ids = [item.id for item in payload]
+        story_ids = [item.id for item in payload if item.type == "story"]
+        with self.lock, self.conn:
+            self._record_batch(batch_num, filename, ids, story_ids)
+            self._complete_days()
+
+    def rebuild_batches(self, filenames: List[str]) -> None:
+        """Re-index the journal after the part files were replaced wholesale (refresh mode)."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM batches")
+            self.conn.execute("DELETE FROM stories")
+            for batch_num, filename in enumerate(filenames, start=1):
+                with open(filename, "r", encoding="utf-8") as handle:
+                    payload = [json.loads(line) for line in handle if line.strip()]
+                if payload:
+                    ids = [item["id"] for item in payload]
+                    story_ids = [item["id"] for item in payload if item["type"] == "story"]
+                    self._record_batch(batch_num, filename, ids, story_ids)
+            self._complete_days()
+
+    def merge_days(self, path: str) -> None:
+        """Copy day registrations and validators from another journal, e.g. a crawl shard's."""
+        with self.lock:
+            self.conn.execute("ATTACH DATABASE ? AS shard", (path,))
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO days (day, pages, stories, completed_at) "
+                        "SELECT day, pages, stories, NULL FROM shard.days"
+                    )
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO day_stories (day, story_id) SELECT day, story_id FROM shard.day_stories"
+                    )
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO validators (story_id, etag, last_modified) "
+                        "SELECT story_id, etag, last_modified FROM shard.validators"
+                    )
+                    self._complete_days()
+            finally:
+                self.conn.execute("DETACH DATABASE shard")
+
+    def _record_batch(self, batch_num: int, filename: str, ids: List[int], story_ids: List[int]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO batches (batch, filename, items, min_id, max_id, flushed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (batch_num, filename, len(ids), min(ids), max(ids), time.time()),
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO stories (id, batch) VALUES (?, ?)",
+            [(story_id, batch_num) for story_id in story_ids],
+        )
+        validators = [
+            (story_id, *self.pending_validators.pop(story_id))
+            for story_id in story_ids
+            if story_id in self.pending_validators
+        ]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO validators (story_id, etag, last_modified) VALUES (?, ?, ?)",
+            validators,
+        )
+
+    def _complete_days(self) -> None:
+        self.conn.execute(
+            """
+            UPDATE days SET completed_at = ?
+            WHERE completed_at IS NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM day_stories ds
+                  LEFT JOIN stories s ON s.id = ds.story_id
+                  WHERE ds.day = days.day AND s.id IS NULL
+              )
+            """,
+            (time.time(),),
+        )
+
+    def summary(self) -> Optional[str]:
+        with self.lock:
+            days = self.conn.execute("SELECT COUNT(*) FROM days WHERE completed_at IS NOT NULL").fetchone()[0]
+            stories = self.conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+            batches = self.conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+        if not batches:
+            return None
+        return f"{days} completed days, {stories:,} story threads in {batches} part file(s)"
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
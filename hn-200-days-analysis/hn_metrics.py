@@ -0,0 +1,285 @@
+"""
+Built-in instrumentation for the HN crawler.
+
+Request latency histograms (front vs item pages), bytes downloaded, parse
+CPU time, retries by status code, queue depths, throughput and a live ETA
+are collected in-process. A reporter thread periodically rewrites a JSON
+snapshot and a Prometheus textfile (for node_exporter's textfile collector)
+and prints a one-line progress summary, so no metrics server is needed.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Optional, Tuple
+
+METRICS_JSON_FILE = "hn_metrics.json"
+METRICS_PROM_FILE = "hn_metrics.prom"
+METRICS_INTERVAL_SECONDS = 15.0
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+REQUEST_KINDS = ("front", "item")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running = 0
+        pairs = []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class CrawlMetrics:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.latency = {kind: Histogram(LATENCY_BUCKETS) for kind in REQUEST_KINDS}
+        self.bytes: DefaultDict[str, int] = defaultdict(int)
+        self.retries: DefaultDict[str, int] = defaultdict(int)
+        self.parse = Histogram(PARSE_BUCKETS)
+        self.parsed_items = 0
+        self.items_done = 0
+        self.items_written = 0
+        self.stories_done = 0
+        self.stories_expected = 0
+        self.days_total = 0
+        self.days_done = 0
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.last_report: Optional[Tuple[float, int]] = None
+        self.reporter: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def observe_request(self, kind: str, latency: float) -> None:
+        with self.lock:
+            self.latency[kind].observe(latency)
+
+    def observe_retry(self, status: Optional[int]) -> None:
+        """Record a retry that was actually scheduled, under the status (or "error") that triggered it."""
+        with self.lock:
+            self.retries["error" if status is None else str(status)] += 1
+
+    def observe_bytes(self, kind: str, size: int) -> None:
+        with self.lock:
+            self.bytes[kind] += size
+
+    def observe_parse(self, seconds: float, items: int) -> None:
+        with self.lock:
+            self.parse.observe(seconds)
+            self.parsed_items += items
+
+    def set_days(self, total: int) -> None:
+        with self.lock:
+            self.days_total = total
+
+    def add_days(self, count: int) -> None:
+        with self.lock:
+            self.days_total += count
+
+    def day_discovered(self, stories: int) -> None:
+        with self.lock:
+            self.days_done += 1
+            self.stories_expected += stories
+
+    def day_skipped(self) -> None:
+        with self.lock:
+            self.days_total -= 1
+
+    def thread_done(self, items: int) -> None:
+        with self.lock:
+            self.stories_done += 1
+            self.items_done += items
+
+    def batch_written(self, items: int) -> None:
+        with self.lock:
+            self.items_written += items
+
+    def watch(self, name: str, source: Callable[[], float]) -> None:
+        """Register a gauge (e.g. a queue depth) that is sampled at snapshot time."""
+        self.gauges[name] = source
+
+    def unwatch(self, name: str) -> None:
+        self.gauges.pop(name, None)
+
+    def eta_seconds(self, elapsed: float) -> Optional[float]:
+        if not self.days_done or not self.stories_done:
+            return None
+        projected = self.stories_expected
+        if self.days_done < self.days_total:
+            projected = self.stories_expected / self.days_done * self.days_total
+        remaining = max(0.0, projected - self.stories_done)
+        return remaining / (self.stories_done / elapsed)
+
+    def snapshot(self) -> Dict:
+        gauges = {}
+        for name, source in list(self.gauges.items()):
+            try:
+                gauges[name] = source()
+            except Exception:
+                continue
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.started, 1e-9)
+            previous_time, previous_items = self.last_report or (self.started, 0)
+            recent = (self.items_done - previous_items) / max(now - previous_time, 1e-9)
+            self.last_report = (now, self.items_done)
+            eta = self.eta_seconds(elapsed)
+            return {
+                "timestamp": time.time(),
+                "elapsed_seconds": round(elapsed, 3),
+                "requests": {
+                    kind: {"latency_seconds": self.latency[kind].to_dict(), "bytes": self.bytes[kind]}
+                    for kind in REQUEST_KINDS
+                },
+                "retries_by_status": dict(self.retries),
+                "parse": {
+                    "seconds_per_thread": self.parse.to_dict(),
+                    "items": self.parsed_items,
+                    "seconds_per_item": self.parse.total / self.parsed_items if self.parsed_items else None,
+                },
+                "gauges": gauges,
+                "days": {"done": self.days_done, "total": self.days_total},
+                "stories": {"done": self.stories_done, "expected": self.stories_expected},
+                "items": {
+                    "done": self.items_done,
+                    "written": self.items_written,
+                    "per_second": round(self.items_done / elapsed, 3),
+                    "per_second_recent": round(recent, 3),
+                },
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+            }
+
+    def write_snapshot(self, directory: str = ".") -> Dict:
+        snapshot = self.snapshot()
+        write_atomic(os.path.join(directory, METRICS_JSON_FILE), json.dumps(snapshot, indent=2) + "\n")
+        write_atomic(os.path.join(directory, METRICS_PROM_FILE), prometheus_text(snapshot))
+        return snapshot
+
+    def start_reporter(self, interval: float = METRICS_INTERVAL_SECONDS, directory: str = ".") -> None:
+        if interval <= 0 or self.reporter:
+            return
+        self.stop_event.clear()
+        self.reporter = threading.Thread(
+            target=self._report_loop, args=(interval, directory), name="hn-metrics", daemon=True
+        )
+        self.reporter.start()
+
+    def stop_reporter(self, directory: str = ".") -> None:
+        if not self.reporter:
+            return
+        self.stop_event.set()
+        self.reporter.join()
+        self.reporter = None
+        self.write_snapshot(directory)
+
+    def _report_loop(self, interval: float, directory: str) -> None:
+        while not self.stop_event.wait(interval):
+            print(progress_line(self.write_snapshot(directory)))
+
+
+def write_atomic(path: str, content: str) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        handle.write(content)
+    os.replace(temp_path, path)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "unknown"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+def progress_line(snapshot: Dict) -> str:
+    stories = snapshot["stories"]
+    items = snapshot["items"]
+    gauges = snapshot["gauges"]
+    queue_info = ", ".join(f"{name} {value:g}" for name, value in sorted(gauges.items()))
+    return (
+        f"Progress: {stories['done']:,}/{stories['expected']:,} stories, {items['done']:,} items "
+        f"({items['per_second_recent']:.1f}/s now, {items['per_second']:.1f}/s avg) [{queue_info}], "
+        f"ETA {format_duration(snapshot['eta_seconds'])}"
+    )
+
+
+def prometheus_text(snapshot: Dict) -> str:
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    def histogram(name: str, help_text: str, series: List[Tuple[str, Dict]]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, data in series:
+            prefix = f"{labels}," if labels else ""
+            for bound, count in data["buckets"].items():
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {data['sum']}")
+            lines.append(f"{name}_count{suffix} {data['count']}")
+
+    requests = snapshot["requests"]
+    histogram(
+        "hn_request_latency_seconds",
+        "Latency of HN page requests.",
+        [(f'kind="{kind}"', data["latency_seconds"]) for kind, data in requests.items()],
+    )
+    metric(
+        "hn_downloaded_bytes_total",
+        "counter",
+        "Response bytes received.",
+        [(f'{{kind="{kind}"}}', data["bytes"]) for kind, data in requests.items()],
+    )
+    metric(
+        "hn_retries_total",
+        "counter",
+        "Retries scheduled, by the HTTP status or error that triggered them.",
+        [(f'{{status="{status}"}}', count) for status, count in sorted(snapshot["retries_by_status"].items())],
+    )
+    histogram("hn_parse_seconds", "Parse CPU time per thread.", [("", snapshot["parse"]["seconds_per_thread"])])
+    metric("hn_parsed_items_total", "counter", "Items produced by the parsers.", [("", snapshot["parse"]["items"])])
+    metric(
+        "hn_gauge",
+        "gauge",
+        "Queue depths and other sampled values.",
+        [(f'{{name="{name}"}}', value) for name, value in sorted(snapshot["gauges"].items())],
+    )
+    metric("hn_items_total", "counter", "Items fetched and parsed.", [("", snapshot["items"]["done"])])
+    metric("hn_items_written_total", "counter", "Items flushed to part files.", [("", snapshot["items"]["written"])])
+    metric("hn_items_per_second", "gauge", "Items per second since the last snapshot.", [("", snapshot["items"]["per_second_recent"])])
+    metric("hn_stories_done_total", "counter", "Story threads completed.", [("", snapshot["stories"]["done"])])
+    metric("hn_stories_expected", "gauge", "Projected story threads for this run.", [("", snapshot["stories"]["expected"])])
+    if snapshot["eta_seconds"] is not None:
+        metric("hn_eta_seconds", "gauge", "Estimated seconds until the crawl finishes.", [("", snapshot["eta_seconds"])])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,757 @@
+"""
+HTML parsing for Hacker News front pages and item (discussion) pages.
+
+Three interchangeable backends produce the same records: BeautifulSoup with
+precompiled soupsieve selectors, lxml with precompiled XPath expressions, and
+a streaming lxml backend that never holds a whole item page in memory. The
+streaming backend is used when lxml is installed.
+
+Comment and story HTML is stored in html.parser's serialisation, the one the
+original BeautifulSoup crawler wrote. HN leaves <p> unclosed; html.parser
+nests each paragraph in the previous one while libxml2 closes them as
+siblings, so the lxml backends rewrite their output to the nested form (see
+html_parser_markup()).
+"""
+
+import codecs
+import marshal
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from html import escape, unescape
+from typing import DefaultDict, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from hn_records import Comment, Story, kids_array
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # Fall back to the BeautifulSoup backend.
+    etree = None
+    lxml_html = None
+
+
+SITE_URL = "https://news.ycombinator.com"
+
+OPEN_PARAGRAPH = re.compile(r"<p\b[^>]*>", re.IGNORECASE)
+CLOSE_PARAGRAPH = re.compile(r"</p\s*>", re.IGNORECASE)
+VOID_ELEMENT = re.compile(r"<(area|br|col|embed|hr|img|input|wbr)\b([^>]*?)\s*/?>", re.IGNORECASE)
+
+Markup = Union[str, bytes]
+FrontPage = Tuple[List[Story], Optional[str]]
+ItemPage = Tuple[str, List[Comment], List[int]]
+PageParse = Tuple[str, List[Comment], Optional[str]]
+
+
+def parse_iso_timestamp(value: str) -> int:
+    cleaned = value
+    if cleaned.endswith("Z"):
+        cleaned = cleaned.replace("Z", "+00:00")
+    if "+" not in cleaned and "-" not in cleaned[10:]:
+        cleaned += "+00:00"
+    dt = datetime.fromisoformat(cleaned)
+    return int(dt.timestamp())
+
+
+def parse_age(title: Optional[str]) -> int:
+    if title:
+        try:
+            return parse_iso_timestamp(title)
+        except ValueError:
+            pass
+    return int(time.time())
+
+
+def parse_comment_count(text: str) -> int:
+    stripped = text.strip()
+    if not stripped or stripped == "discuss":
+        return 0
+    for token in stripped.split():
+        if token.isdigit():
+            return int(token)
+    return 0
+
+
+def parse_score(text: str) -> int:
+    parts = text.split()
+    if parts:
+        try:
+            return int(parts[0])
+        except ValueError:
+            return 0
+    return 0
+
+
+def normalize_story_url(url: str) -> str:
+    return urljoin(f"{SITE_URL}/", url)
+
+
+def html_parser_markup(fragment: str) -> str:
+    """
+    Rewrite libxml2's serialisation of a comment body into html.parser's:
+    HN's unclosed paragraphs closed together at the end (one<p>two<p>three
+    -> one<p>two<p>three</p></p>, not one<p>two</p><p>three</p>) and void
+    elements self-closed (<br/>). Idempotent, so html.parser output is left as it is.
+    """
+    body = CLOSE_PARAGRAPH.sub("", fragment)
+    body = VOID_ELEMENT.sub(r"<\1\2/>", body)
+    return body + "</p>" * len(OPEN_PARAGRAPH.findall(body))
+
+
+def day_start_timestamp(day: datetime) -> int:
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def story_record(
+    story_id: int,
+    title: str,
+    href: str,
+    author: Optional[str],
+    timestamp: int,
+    score: int,
+    descendants: int,
+) -> Story:
+    return Story(story_id, title, normalize_story_url(href), author, timestamp, score, "", descendants)
+
+
+def comment_record(
+    comment_id: int,
+    parent_id: int,
+    depth: int,
+    author: Optional[str],
+    timestamp: int,
+    score: int,
+    text_html: str,
+) -> Comment:
+    deleted = text_html == "[deleted]"
+    text = "" if deleted else text_html
+    return Comment(comment_id, timestamp, author, score, text, 0, kids_array(), parent_id, deleted, depth)
+
+
+def add_to_parent(parent: Comment, child: Comment) -> None:
+    """Fold a comment whose subtree is complete into its parent's subtree size and reply latency."""
+    parent.descendants += child.descendants + 1
+    latency = child.time - parent.time
+    if parent.reply_latency is None or latency < parent.reply_latency:
+        parent.reply_latency = latency
+
+
+def attach_kids(comments: List[Comment], kids_map: DefaultDict[int, List[int]]) -> None:
+    """
+    Attach kids lists and fill in the subtree metrics in one pass. Comments
+    are in document order, which is pre-order, so walking them backwards
+    reaches every comment after all of its descendants.
+    """
+    by_id = {comment.id: comment for comment in comments}
+    for comment in reversed(comments):
+        kids = kids_map.get(comment.id)
+        if kids:
+            comment.kids = kids_array(kids)
+        parent = by_id.get(comment.parent)
+        if parent is not None:
+            add_to_parent(parent, comment)
+
+
+def more_link_page(href: Optional[str]) -> Optional[int]:
+    """Page number a "More" link points at (item?id=1&p=2 -> 2), or None."""
+    if not href:
+        return None
+    values = parse_qs(urlsplit(href).query).get("p")
+    if values and values[0].isdigit():
+        return int(values[0])
+    return None
+
+
+def indent_depth(width: Optional[str]) -> int:
+    if width is None:
+        return 0
+    try:
+        return int(width) // 40
+    except ValueError:
+        return 0
+
+
+class BeautifulSoupParser:
+    """Pure-Python backend: html.parser with selectors compiled once."""
+
+    name = "bs4"
+
+    STORY_ROWS = soupsieve.compile("tr.athing")
+    TITLE_LINK = soupsieve.compile(".titleline > a")
+    SCORE = soupsieve.compile("span.score")
+    AUTHOR = soupsieve.compile("a.hnuser")
+    AGE = soupsieve.compile("span.age")
+    LINKS = soupsieve.compile("a")
+    MORE_LINK = soupsieve.compile("a.morelink")
+    STORY_TEXT = soupsieve.compile("table.fatitem span.commtext")
+    COMMENT_ROWS = soupsieve.compile("tr.comtr")
+    INDENT_IMG = soupsieve.compile("td.ind img")
+    COMMENT_CELL = soupsieve.compile("td.default")
+    COMMENT_TEXT = soupsieve.compile("span.commtext")
+
+    def parse_front_page(self, html: Markup, day: datetime) -> FrontPage:
+        soup = BeautifulSoup(html, "html.parser")
+        stories: List[Story] = []
+        for row in self.STORY_ROWS.select(soup):
+            story_id = row.get("id")
+            if not story_id:
+                continue
+            title_link = self.TITLE_LINK.select_one(row)
+            if not title_link:
+                continue
+            subtext = row.find_next_sibling("tr")
+            score = 0
+            author = None
+            timestamp = day_start_timestamp(day)
+            descendants = 0
+            if subtext:
+                score_span = self.SCORE.select_one(subtext)
+                if score_span:
+                    score = parse_score(score_span.text)
+                author_link = self.AUTHOR.select_one(subtext)
+                if author_link:
+                    author = author_link.text.strip()
+                age_span = self.AGE.select_one(subtext)
+                timestamp = parse_age(age_span.get("title") if age_span else None)
+                for link in self.LINKS.select(subtext):
+                    href = link.get("href", "")
+                    if href.startswith("item?id="):
+                        descendants = parse_comment_count(link.text)
+            stories.append(
+                story_record(
+                    int(story_id),
+                    title_link.get_text(strip=True),
+                    title_link.get("href", ""),
+                    author,
+                    timestamp,
+                    score,
+                    descendants,
+                )
+            )
+        more_link = self.MORE_LINK.select_one(soup)
+        return stories, more_link.get("href") if more_link else None
+
+    def thread_parse(self, story_id: int) -> "ThreadParse":
+        return ThreadParse(self, story_id)
+
+    def parse_item_markup(
+        self,
+        html: Markup,
+        story_id: int,
+        stack: List[int],
+        kids_map: DefaultDict[int, List[int]],
+    ) -> PageParse:
+        soup = BeautifulSoup(html, "html.parser")
+        comments = self.parse_comment_tree(soup, story_id, stack, kids_map)
+        more_link = self.MORE_LINK.select_one(soup)
+        return self.extract_story_text(soup), comments, more_link.get("href") if more_link else None
+
+    def extract_story_text(self, soup: BeautifulSoup) -> str:
+        block = self.STORY_TEXT.select_one(soup)
+        if block:
+            return block.decode_contents().strip()
+        return ""
+
+    def parse_comment_tree(
+        self,
+        soup: BeautifulSoup,
+        story_id: int,
+        stack: List[int],
+        kids_map: DefaultDict[int, List[int]],
+    ) -> List[Comment]:
+        comments: List[Comment] = []
+        for row in self.COMMENT_ROWS.select(soup):
+            comment_id = row.get("id")
+            if not comment_id:
+                continue
+            try:
+                numeric_id = int(comment_id)
+            except ValueError:
+                continue
+
+            indent_img = self.INDENT_IMG.select_one(row)
+            depth = indent_depth(indent_img.get("width") if indent_img else None)
+
+            while len(stack) > depth:
+                stack.pop()
+            parent_id = story_id if not stack else stack[-1]
+            stack.append(numeric_id)
+            depth = len(stack)
+
+            default_td = self.COMMENT_CELL.select_one(row)
+            if not default_td:
+                continue
+            comm_text = self.COMMENT_TEXT.select_one(default_td)
+            text_html = comm_text.decode_contents().strip() if comm_text else ""
+            user_link = self.AUTHOR.select_one(default_td)
+            author = user_link.text.strip() if user_link else None
+            age_span = self.AGE.select_one(default_td)
+            timestamp = parse_age(age_span.get("title") if age_span else None)
+            score_span = self.SCORE.select_one(default_td)
+            score = parse_score(score_span.text) if score_span else 0
+
+            comments.append(comment_record(numeric_id, parent_id, depth, author, timestamp, score, text_html))
+            kids_map[parent_id].append(numeric_id)
+
+        return comments
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser:
+    """libxml2 backend: the same selectors as precompiled XPath expressions."""
+
+    name = "lxml"
+
+    if etree is not None:
+        STORY_ROWS = etree.XPath(f"//tr[{_has_class('athing')}]")
+        TITLE_LINK = etree.XPath(f".//*[{_has_class('titleline')}]/a")
+        SUBTEXT = etree.XPath("following-sibling::tr[1]")
+        SCORE = etree.XPath(f".//span[{_has_class('score')}]")
+        AUTHOR = etree.XPath(f".//a[{_has_class('hnuser')}]")
+        AGE_TITLE = etree.XPath(f"(.//span[{_has_class('age')}])[1]/@title")
+        ITEM_LINKS = etree.XPath(".//a[starts-with(@href, 'item?id=')]")
+        MORE_LINK = etree.XPath(f"(//a[{_has_class('morelink')}])[1]/@href")
+        STORY_TEXT = etree.XPath(f"//table[{_has_class('fatitem')}]//span[{_has_class('commtext')}]")
+        STORY_TEXT_IN_TABLE = etree.XPath(f".//span[{_has_class('commtext')}]")
+        COMMENT_ROWS = etree.XPath(f"//tr[{_has_class('comtr')}]")
+        INDENT_WIDTH = etree.XPath(f"(.//td[{_has_class('ind')}]//img)[1]/@width")
+        COMMENT_CELL = etree.XPath(f".//td[{_has_class('default')}]")
+        COMMENT_TEXT = etree.XPath(f".//span[{_has_class('commtext')}]")
+
+    def __init__(self) -> None:
+        if etree is None:
+            raise RuntimeError("The lxml parser backend requires lxml (pip install lxml).")
+
+    @staticmethod
+    def _first(matches: List) -> Optional[object]:
+        return matches[0] if matches else None
+
+    @staticmethod
+    def _text(element) -> str:
+        return "".join(element.itertext())
+
+    @staticmethod
+    def _inner_html(element) -> str:
+        parts = [escape(element.text, quote=False)] if element.text else []
+        for child in element:
+            parts.append(etree.tostring(child, encoding="unicode", method="html", with_tail=True))
+        return html_parser_markup("".join(parts).strip())
+
+    def parse_front_page(self, html: Markup, day: datetime) -> FrontPage:
+        root = lxml_html.document_fromstring(html)
+        stories: List[Story] = []
+        for row in self.STORY_ROWS(root):
+            story_id = row.get("id")
+            if not story_id:
+                continue
+            title_link = self._first(self.TITLE_LINK(row))
+            if title_link is None:
+                continue
+            subtext = self._first(self.SUBTEXT(row))
+            score = 0
+            author = None
+            timestamp = day_start_timestamp(day)
+            descendants = 0
+            if subtext is not None:
+                score_span = self._first(self.SCORE(subtext))
+                if score_span is not None:
+                    score = parse_score(self._text(score_span))
+                author_link = self._first(self.AUTHOR(subtext))
+                if author_link is not None:
+                    author = self._text(author_link).strip()
+                timestamp = parse_age(self._first(self.AGE_TITLE(subtext)))
+                item_links = self.ITEM_LINKS(subtext)
+                if item_links:
+                    descendants = parse_comment_count(self._text(item_links[-1]))
+            stories.append(
+                story_record(
+                    int(story_id),
+                    "".join(text.strip() for text in title_link.itertext()),
+                    title_link.get("href", ""),
+                    author,
+                    timestamp,
+                    score,
+                    descendants,
+                )
+            )
+        return stories, self._first(self.MORE_LINK(root))
+
+    def thread_parse(self, story_id: int) -> "ThreadParse":
+        return ThreadParse(self, story_id)
+
+    def parse_item_markup(
+        self,
+        html: Markup,
+        story_id: int,
+        stack: List[int],
+        kids_map: DefaultDict[int, List[int]],
+    ) -> PageParse:
+        root = lxml_html.document_fromstring(html)
+        block = self._first(self.STORY_TEXT(root))
+        story_text = self._inner_html(block) if block is not None else ""
+
+        comments: List[Comment] = []
+        for row in self.COMMENT_ROWS(root):
+            comment_id = row.get("id")
+            if not comment_id:
+                continue
+            try:
+                numeric_id = int(comment_id)
+            except ValueError:
+                continue
+
+            depth = indent_depth(self._first(self.INDENT_WIDTH(row)))
+            while len(stack) > depth:
+                stack.pop()
+            parent_id = story_id if not stack else stack[-1]
+            stack.append(numeric_id)
+            depth = len(stack)
+
+            default_td = self._first(self.COMMENT_CELL(row))
+            if default_td is None:
+                continue
+            comm_text = self._first(self.COMMENT_TEXT(default_td))
+            text_html = self._inner_html(comm_text) if comm_text is not None else ""
+            user_link = self._first(self.AUTHOR(default_td))
+            author = self._text(user_link).strip() if user_link is not None else None
+            timestamp = parse_age(self._first(self.AGE_TITLE(default_td)))
+            score_span = self._first(self.SCORE(default_td))
+            score = parse_score(self._text(score_span)) if score_span is not None else 0
+
+            comments.append(comment_record(numeric_id, parent_id, depth, author, timestamp, score, text_html))
+            kids_map[parent_id].append(numeric_id)
+
+        return story_text, comments, self._first(self.MORE_LINK(root))
+
+
+class ThreadParse:
+    """
+    Accumulates the pages of one item thread for the DOM backends. HN splits
+    long discussions across item?id=N&p=2, p=3, ... and a continuation page
+    can open in the middle of a subtree, so the indentation stack and the
+    parent -> kids map carry over from one page to the next.
+    """
+
+    def __init__(self, backend, story_id: int) -> None:
+        self.backend = backend
+        self.story_id = story_id
+        self.story_text = ""
+        self.comments: List[Comment] = []
+        self.kids_map: DefaultDict[int, List[int]] = defaultdict(list)
+        self.stack: List[int] = []
+        self.more_link: Optional[str] = None
+        self.pages = 0
+        self.first_page_comments = 0
+        self.cpu_seconds = 0.0
+
+    @property
+    def comment_count(self) -> int:
+        return len(self.comments)
+
+    def add_page(self, page: Union[Markup, Iterable[Markup]]) -> None:
+        started = time.thread_time()
+        if not isinstance(page, (str, bytes)):
+            chunks = list(page)
+            page = b"".join(chunks) if chunks and isinstance(chunks[0], bytes) else "".join(chunks)
+        story_text, comments, self.more_link = self.backend.parse_item_markup(
+            page, self.story_id, self.stack, self.kids_map
+        )
+        if not self.pages:
+            self.story_text = story_text
+            self.first_page_comments = len(comments)
+        self.comments.extend(comments)
+        self.pages += 1
+        self.cpu_seconds += time.thread_time() - started
+
+    def finish(self) -> ItemPage:
+        started = time.thread_time()
+        attach_kids(self.comments, self.kids_map)
+        self.cpu_seconds += time.thread_time() - started
+        return self.story_text, self.comments, self.kids_map.get(self.story_id, [])
+
+
+class StreamingCommentParser:
+    """
+    Event-driven parser for an item thread. Markup is fed in chunks and each
+    comment row is handled and discarded as soon as lxml closes it; only the
+    chain of open ancestors (the indentation stack) is kept. A comment is
+    emitted once the next row at its depth or shallower proves its kids list
+    complete, so records come out in post-order, and as each one is emitted
+    its finished subtree is folded into its parent's metrics. Continuation
+    pages are fed after end_page() and pick up the stack where the previous
+    page left it.
+    """
+
+    FEED_CHUNK = 64 * 1024
+
+    def __init__(self, story_id: int) -> None:
+        if etree is None:
+            raise RuntimeError("The streaming parser backend requires lxml (pip install lxml).")
+        self.story_id = story_id
+        self.story_text = ""
+        self.story_kids: List[int] = []
+        self.comment_count = 0
+        self.more_link: Optional[str] = None
+        self._stack: List[Tuple[int, Optional[Comment]]] = []
+        self._decoder = None
+        self._parser = None
+
+    def feed(self, chunk: Markup) -> Iterator[Comment]:
+        if self._parser is None:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            self._parser = etree.HTMLPullParser(events=("end",))
+            self.more_link = None
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._parser.feed(chunk)
+        return self._drain()
+
+    def end_page(self) -> Iterator[Comment]:
+        """Finish the current page; comments still open on the stack stay pending."""
+        if self._parser is None:
+            return
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._parser.feed(tail)
+        self._parser.close()
+        yield from self._drain()
+        self._parser = None
+
+    def close(self) -> Iterator[Comment]:
+        yield from self.end_page()
+        while self._stack:
+            yield from self._emit(self._stack.pop())
+
+    def _drain(self) -> Iterator[Comment]:
+        for _, element in self._parser.read_events():
+            if element.tag == "tr":
+                classes = (element.get("class") or "").split()
+                if "comtr" in classes:
+                    yield from self._handle_row(element)
+                    self._discard(element)
+            elif element.tag == "table" and "fatitem" in (element.get("class") or "").split():
+                block = LxmlParser._first(LxmlParser.STORY_TEXT_IN_TABLE(element))
+                if block is not None:
+                    self.story_text = LxmlParser._inner_html(block)
+                self._discard(element)
+            elif element.tag == "a" and "morelink" in (element.get("class") or "").split():
+                self.more_link = element.get("href")
+
+    @staticmethod
+    def _discard(element) -> None:
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+    def _emit(self, entry: Tuple[int, Optional[Comment]]) -> Iterator[Comment]:
+        record = entry[1]
+        if record is not None:
+            # The entry is already popped, so the top of the stack is its parent.
+            parent_record = self._stack[-1][1] if self._stack else None
+            if parent_record is not None:
+                add_to_parent(parent_record, record)
+            yield record
+
+    def _handle_row(self, row) -> Iterator[Comment]:
+        comment_id = row.get("id")
+        if not comment_id:
+            return
+        try:
+            numeric_id = int(comment_id)
+        except ValueError:
+            return
+
+        depth = indent_depth(LxmlParser._first(LxmlParser.INDENT_WIDTH(row)))
+        while len(self._stack) > depth:
+            yield from self._emit(self._stack.pop())
+        parent_id = self.story_id if not self._stack else self._stack[-1][0]
+
+        record = None
+        default_td = LxmlParser._first(LxmlParser.COMMENT_CELL(row))
+        if default_td is not None:
+            comm_text = LxmlParser._first(LxmlParser.COMMENT_TEXT(default_td))
+            text_html = LxmlParser._inner_html(comm_text) if comm_text is not None else ""
+            user_link = LxmlParser._first(LxmlParser.AUTHOR(default_td))
+            author = LxmlParser._text(user_link).strip() if user_link is not None else None
+            timestamp = parse_age(LxmlParser._first(LxmlParser.AGE_TITLE(default_td)))
+            score_span = LxmlParser._first(LxmlParser.SCORE(default_td))
+            score = parse_score(LxmlParser._text(score_span)) if score_span is not None else 0
+            record = comment_record(numeric_id, parent_id, len(self._stack) + 1, author, timestamp, score, text_html)
+            self.comment_count += 1
+            if self._stack:
+                parent_record = self._stack[-1][1]
+                if parent_record is not None:
+                    parent_record.kids.append(numeric_id)
+            else:
+                self.story_kids.append(numeric_id)
+        self._stack.append((numeric_id, record))
+
+
+class StreamingThreadParse:
+    """ThreadParse counterpart for the streaming backend; pages may arrive as chunk iterables."""
+
+    def __init__(self, story_id: int) -> None:
+        self.stream = StreamingCommentParser(story_id)
+        self.comments: List[Comment] = []
+        self.more_link: Optional[str] = None
+        self.pages = 0
+        self.first_page_comments = 0
+        self.cpu_seconds = 0.0
+
+    @property
+    def comment_count(self) -> int:
+        return self.stream.comment_count
+
+    def add_page(self, page: Union[Markup, Iterable[Markup]]) -> None:
+        # Thread CPU time, so waiting on a streamed response is not counted as parsing.
+        started = time.thread_time()
+        chunks = page
+        if isinstance(page, (str, bytes)):
+            size = StreamingCommentParser.FEED_CHUNK
+            chunks = (page[offset : offset + size] for offset in range(0, len(page), size))
+        for chunk in chunks:
+            self.comments.extend(self.stream.feed(chunk))
+        self.comments.extend(self.stream.end_page())
+        self.more_link = self.stream.more_link
+        if not self.pages:
+            self.first_page_comments = self.stream.comment_count
+        self.pages += 1
+        self.cpu_seconds += time.thread_time() - started
+
+    def finish(self) -> ItemPage:
+        started = time.thread_time()
+        self.comments.extend(self.stream.close())
+        self.cpu_seconds += time.thread_time() - started
+        return self.stream.story_text, self.comments, self.stream.story_kids
+
+
+class RawThreadPages:
+    """
+    Collects the raw pages of one thread for a parse stage in another
+    process. Only what a fetcher needs to request continuation pages (the
+    comment row count and the "More" link) is pulled out, by scanning the
+    <tr> and <a> start tags instead of a parse. Attribute values may be
+    double-, single- or unquoted and class lists in any order, as for the
+    parser backends.
+    """
+
+    START_TAG = re.compile(rb"""<(tr|a)\b((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.IGNORECASE)
+    ATTRIBUTE = re.compile(rb"""([^\s"'>/=]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+
+    def __init__(self) -> None:
+        self.bodies: List[bytes] = []
+        self.more_link: Optional[str] = None
+        self.comment_count = 0
+        self.first_page_comments = 0
+
+    @property
+    def pages(self) -> int:
+        return len(self.bodies)
+
+    @classmethod
+    def attributes(cls, raw: bytes) -> Dict[bytes, str]:
+        found: Dict[bytes, str] = {}
+        for match in cls.ATTRIBUTE.finditer(raw):
+            value = match.group(2) or match.group(3) or match.group(4) or b""
+            # Like the HTML parsers, the first of a repeated attribute wins.
+            found.setdefault(match.group(1).lower(), unescape(value.decode("utf-8", errors="replace")))
+        return found
+
+    def add_page(self, body: bytes) -> None:
+        rows = 0
+        more_link = None
+        for tag in self.START_TAG.finditer(body):
+            attributes = self.attributes(tag.group(2))
+            classes = attributes.get(b"class", "").split()
+            if tag.group(1).lower() == b"tr":
+                rows += "comtr" in classes
+            elif more_link is None and "morelink" in classes:
+                more_link = attributes.get(b"href")
+        if not self.bodies:
+            self.first_page_comments = rows
+        self.comment_count += rows
+        self.bodies.append(body)
+        self.more_link = more_link
+
+
+class StreamingParser(LxmlParser):
+    """lxml front pages plus the constant-memory streaming item parser."""
+
+    name = "stream"
+
+    def thread_parse(self, story_id: int) -> StreamingThreadParse:
+        return StreamingThreadParse(story_id)
+
+
+PARSER_BACKENDS = {
+    BeautifulSoupParser.name: BeautifulSoupParser,
+    LxmlParser.name: LxmlParser,
+    StreamingParser.name: StreamingParser,
+}
+DEFAULT_PARSER_BACKEND = StreamingParser.name if etree is not None else BeautifulSoupParser.name
+
+_active_parser = PARSER_BACKENDS[DEFAULT_PARSER_BACKEND]()
+
+
+def set_parser_backend(name: str) -> None:
+    global _active_parser
+    _active_parser = PARSER_BACKENDS[name]()
+
+
+def parse_front_page(html: Markup, day: datetime) -> FrontPage:
+    """Return the page's stories and the "More" link (or None) from one parse."""
+    return _active_parser.parse_front_page(html, day)
+
+
+def new_thread_parse(story_id: int) -> Union[ThreadParse, StreamingThreadParse]:
+    """Start parsing one thread; feed it pages with add_page() and collect with finish()."""
+    return _active_parser.thread_parse(story_id)
+
+
+def parse_item_pages(pages: Sequence[Markup], story_id: int) -> ItemPage:
+    """
+    Return the story text, the comment records and the story's kids for a
+    thread's pages in order. A page is only used while the previous one links
+    to it, so speculatively fetched pages past the end are ignored.
+    """
+    thread = new_thread_parse(story_id)
+    for page in pages:
+        if thread.pages and not thread.more_link:
+            break
+        thread.add_page(page)
+    return thread.finish()
+
+
+def parse_thread_pages(story_id: int, pages: List[bytes]) -> bytes:
+    """
+    Parse-stage entry point for worker processes. Comments go back as
+    marshal-encoded row tuples, which cross the process boundary far more
+    cheaply than pickled objects. The worker's CPU time rides along.
+    """
+    started = time.process_time()
+    story_text, comments, story_kids = parse_item_pages(
+        [page.decode("utf-8", errors="replace") for page in pages], story_id
+    )
+    rows = [comment.to_row() for comment in comments]
+    return marshal.dumps((time.process_time() - started, story_text, rows, story_kids))
+
+
+def unpack_item_page(packed: bytes) -> Tuple[float, ItemPage]:
+    """Return the parse CPU seconds and the item page from parse_thread_pages() output."""
+    cpu_seconds, story_text, rows, story_kids = marshal.loads(packed)
+    return cpu_seconds, (story_text, [Comment.from_row(row) for row in rows], story_kids)
+
+
+def streaming_enabled() -> bool:
+    return isinstance(_active_parser, StreamingParser)
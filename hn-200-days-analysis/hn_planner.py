@@ -0,0 +1,67 @@
+"""
+Cost-aware planning of the HN crawler's item fetches, from front-page data alone.
+
+A link post whose front page shows no comments has an item page with
+nothing on it the crawl needs, so its record is written without a request.
+Every other thread is costed from its front-page comment count and the
+largest threads are fetched first: a long discussion spans several item
+pages, and one that starts last would otherwise leave the crawl waiting on
+a single straggler. The same estimates give the request and runtime totals
+printed by --dry-run.
+"""
+
+import math
+from datetime import timedelta
+from typing import Iterable, Iterator, Tuple
+
+from hn_parsing import SITE_URL
+from hn_records import Story
+
+# Roughly how many comments HN serves per item page before a "More" link.
+ITEM_PAGE_COMMENTS = 250
+
+
+def is_text_post(story: Story) -> bool:
+    """Ask HN and other text posts link to their own item page, which holds the text."""
+    return story.url.startswith(f"{SITE_URL}/item?")
+
+
+def estimated_requests(story: Story) -> int:
+    return max(1, math.ceil(story.descendants / ITEM_PAGE_COMMENTS))
+
+
+class CrawlPlanner:
+    """Orders discovered stories for fetching and keeps the running estimate."""
+
+    def __init__(self, skip_empty: bool = True) -> None:
+        self.skip_empty = skip_empty
+        self.threads = 0
+        self.requests = 0
+        self.comments = 0
+        self.skipped = 0
+
+    def skips(self, story: Story) -> bool:
+        """True if the story's item page cannot add anything: a link post with no comments."""
+        return self.skip_empty and story.descendants == 0 and not is_text_post(story)
+
+    def plan(self, stories: Iterable[Story]) -> Iterator[Tuple[float, Story]]:
+        """
+        Yield (priority, story) pairs, lowest priority first: stories that need
+        no request, then threads from the largest estimated size down.
+        """
+        for story in stories:
+            if self.skips(story):
+                self.skipped += 1
+                yield -math.inf, story
+                continue
+            self.threads += 1
+            self.requests += estimated_requests(story)
+            self.comments += story.descendants
+            yield -float(story.descendants), story
+
+    def describe(self, rate: float) -> str:
+        runtime = timedelta(seconds=round(self.requests / max(rate, 0.001)))
+        return (
+            f"{self.threads:,} thread(s) with ~{self.comments:,} comments ≈ {self.requests:,} item request(s), "
+            f"about {runtime} at {rate:.1f} req/s; {self.skipped:,} link post(s) without comments need no request"
+        )
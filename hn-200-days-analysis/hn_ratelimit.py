@@ -0,0 +1,121 @@
+"""
+Process-wide adaptive rate limiter for requests to news.ycombinator.com.
+
+A token bucket meters every front-page and item request. Its refill rate
+follows AIMD: each success adds a little, while throttling responses
+(403/429), server errors, connection failures and a sustained rise in
+latency cut it multiplicatively. A latency rise only counts when it is both
+relative and absolute (jitter of a few milliseconds on a fast host is not a
+slowdown), and the rate halves at most a few times per window. The crawl
+therefore runs as fast as the site tolerates instead of as slow as a fixed
+worst-case sleep.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+
+RATE_INITIAL = 8.0
+RATE_MIN = 0.5
+RATE_MAX = 40.0
+RATE_BURST = 4.0
+ADDITIVE_STEP = 0.5
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_SECONDS = 2.0
+DECREASE_WINDOW_SECONDS = 30.0
+MAX_DECREASES_PER_WINDOW = 3
+BLOCKED_PAUSE_TOKENS = 4.0
+LATENCY_FAST_ALPHA = 0.3
+LATENCY_SLOW_ALPHA = 0.02
+LATENCY_SLOWDOWN_FACTOR = 2.0
+LATENCY_MIN_SLOWDOWN_SECONDS = 0.25
+LATENCY_MIN_SAMPLES = 20
+
+THROTTLE_STATUSES = (403, 429)
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        rate: float = RATE_INITIAL,
+        min_rate: float = RATE_MIN,
+        max_rate: float = RATE_MAX,
+        burst: float = RATE_BURST,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreases: Deque[float] = deque()
+        self.latency_fast: Optional[float] = None
+        self.latency_slow: Optional[float] = None
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(delay, self.paused_until - now)
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, status: Optional[int], latency: float, retry_after: Optional[str] = None) -> None:
+        """Feed back one response (status None for a connection error or timeout)."""
+        with self.lock:
+            if status is None or status in THROTTLE_STATUSES or status >= 500:
+                reason = "connection error" if status is None else f"HTTP {status}"
+                self._decrease(reason)
+                if status in THROTTLE_STATUSES:
+                    pause = BLOCKED_PAUSE_TOKENS / self.rate
+                    if retry_after and retry_after.isdigit():
+                        pause = max(pause, float(retry_after))
+                    self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                return
+
+            self.samples += 1
+            if self.latency_fast is None:
+                self.latency_fast = self.latency_slow = latency
+            else:
+                self.latency_fast += LATENCY_FAST_ALPHA * (latency - self.latency_fast)
+                self.latency_slow += LATENCY_SLOW_ALPHA * (latency - self.latency_slow)
+            if (
+                self.samples >= LATENCY_MIN_SAMPLES
+                and self.latency_fast > self.latency_slow * LATENCY_SLOWDOWN_FACTOR
+                and self.latency_fast - self.latency_slow > LATENCY_MIN_SLOWDOWN_SECONDS
+            ):
+                self._decrease(f"latency {self.latency_fast:.2f}s vs {self.latency_slow:.2f}s baseline")
+                return
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_STEP / self.rate)
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        while self.decreases and now - self.decreases[0] > DECREASE_WINDOW_SECONDS:
+            self.decreases.popleft()
+        if self.decreases and now - self.decreases[-1] < DECREASE_COOLDOWN_SECONDS:
+            return
+        if len(self.decreases) >= MAX_DECREASES_PER_WINDOW:
+            return
+        self.decreases.append(now)
+        self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+        print(f"Rate limiter: {reason}, slowing to {self.rate:.1f} req/s")
+
+    def describe(self) -> str:
+        return f"{self.rate:.1f} req/s"
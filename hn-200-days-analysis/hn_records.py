@@ -0,0 +1,308 @@
+"""
+Compact in-memory records for scraped HN stories and comments.
+
+Items are slotted objects instead of dicts: no per-instance __dict__, author
+names interned so each distinct user is stored once, kids held in a packed
+int64 array, and constant fields (a comment's empty title and url, each
+record's type) kept on the class. They are turned into the part-file JSON
+layout only when a batch is written.
+
+Besides the HN fields, records carry thread-shape metrics worked out while
+parsing: `descendants` is the true subtree size, `depth` a comment's level
+(1 for a top-level comment), `reply_latency` the seconds until the first
+direct reply (None without replies) and, on stories, `max_depth`. With
+parent and depth on every comment, the `kids` arrays can be left out of the
+part files (kids=False) without losing the tree. Records of a sample crawl
+also carry `sample_weight` (see hn_sampling.py); it is written only when set.
+
+Part files written before these metrics have no `depth` and count only
+direct replies in a comment's `descendants`; thread_from_dicts() rebuilds
+the metrics of such a thread from its parent links when it is read back.
+"""
+
+import json
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+KIDS_TYPECODE = "q"
+
+
+def intern_author(author: Optional[str]) -> Optional[str]:
+    return sys.intern(author) if author else author
+
+
+def kids_array(kids: Iterable[int] = ()) -> array:
+    return array(KIDS_TYPECODE, kids)
+
+
+class Story:
+    __slots__ = (
+        "id",
+        "title",
+        "url",
+        "by",
+        "time",
+        "score",
+        "text",
+        "descendants",
+        "kids",
+        "max_depth",
+        "reply_latency",
+        "sample_weight",
+    )
+
+    type = "story"
+
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        url: str,
+        by: Optional[str],
+        time: int,
+        score: int,
+        text: str = "",
+        descendants: int = 0,
+        kids: Optional[array] = None,
+        max_depth: int = 0,
+        reply_latency: Optional[int] = None,
+        sample_weight: Optional[float] = None,
+    ) -> None:
+        self.id = id
+        self.title = title
+        self.url = url
+        self.by = intern_author(by)
+        self.time = time
+        self.score = score
+        self.text = text
+        self.descendants = descendants
+        self.kids = kids if kids is not None else kids_array()
+        self.max_depth = max_depth
+        self.reply_latency = reply_latency
+        self.sample_weight = sample_weight
+
+    def copy(self) -> "Story":
+        return Story(
+            self.id,
+            self.title,
+            self.url,
+            self.by,
+            self.time,
+            self.score,
+            self.text,
+            self.descendants,
+            self.kids,
+            self.max_depth,
+            self.reply_latency,
+            self.sample_weight,
+        )
+
+    def to_dict(self, kids: bool = True) -> Dict:
+        item = {
+            "id": self.id,
+            "type": self.type,
+            "title": self.title,
+            "url": self.url,
+            "by": self.by,
+            "time": self.time,
+            "score": self.score,
+            "text": self.text,
+            "descendants": self.descendants,
+            "max_depth": self.max_depth,
+            "reply_latency": self.reply_latency,
+        }
+        if kids:
+            item["kids"] = self.kids.tolist()
+        if self.sample_weight is not None:
+            item["sample_weight"] = self.sample_weight
+        return item
+
+    @classmethod
+    def from_dict(cls, item: Dict) -> "Story":
+        return cls(
+            item["id"],
+            item.get("title", ""),
+            item.get("url", ""),
+            item.get("by"),
+            item.get("time", 0),
+            item.get("score", 0),
+            item.get("text", ""),
+            item.get("descendants") or 0,
+            kids_array(item.get("kids") or ()),
+            item.get("max_depth") or 0,
+            item.get("reply_latency"),
+            item.get("sample_weight"),
+        )
+
+
+class Comment:
+    __slots__ = (
+        "id",
+        "time",
+        "by",
+        "score",
+        "text",
+        "descendants",
+        "kids",
+        "parent",
+        "deleted",
+        "depth",
+        "reply_latency",
+        "sample_weight",
+    )
+
+    type = "comment"
+    title = ""
+    url = ""
+
+    def __init__(
+        self,
+        id: int,
+        time: int,
+        by: Optional[str],
+        score: int,
+        text: str,
+        descendants: int,
+        kids: array,
+        parent: int,
+        deleted: bool,
+        depth: Optional[int] = 1,
+        reply_latency: Optional[int] = None,
+        sample_weight: Optional[float] = None,
+    ) -> None:
+        self.id = id
+        self.time = time
+        self.by = intern_author(by)
+        self.score = score
+        self.text = text
+        self.descendants = descendants
+        self.kids = kids
+        self.parent = parent
+        self.deleted = deleted
+        self.depth = depth
+        self.reply_latency = reply_latency
+        self.sample_weight = sample_weight
+
+    def to_row(self) -> Tuple:
+        """Flat tuple of builtins (kids as raw bytes) that marshal can encode."""
+        return (
+            self.id,
+            self.time,
+            self.by,
+            self.score,
+            self.text,
+            self.descendants,
+            self.kids.tobytes(),
+            self.parent,
+            self.deleted,
+            self.depth,
+            self.reply_latency,
+        )
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "Comment":
+        comment_id, time, by, score, text, descendants, kids, parent, deleted, depth, reply_latency = row
+        packed = kids_array()
+        packed.frombytes(kids)
+        return cls(comment_id, time, by, score, text, descendants, packed, parent, deleted, depth, reply_latency)
+
+    def to_dict(self, kids: bool = True) -> Dict:
+        item = {
+            "id": self.id,
+            "type": self.type,
+            "time": self.time,
+            "by": self.by,
+            "score": self.score,
+            "title": self.title,
+            "url": self.url,
+            "text": self.text,
+            "descendants": self.descendants,
+            "parent": self.parent,
+            "depth": self.depth,
+            "reply_latency": self.reply_latency,
+            "deleted": self.deleted,
+        }
+        if kids:
+            item["kids"] = self.kids.tolist()
+        if self.sample_weight is not None:
+            item["sample_weight"] = self.sample_weight
+        return item
+
+    @classmethod
+    def from_dict(cls, item: Dict) -> "Comment":
+        return cls(
+            item["id"],
+            item.get("time", 0),
+            item.get("by"),
+            item.get("score", 0),
+            item.get("text", ""),
+            item.get("descendants") or 0,
+            kids_array(item.get("kids") or ()),
+            item.get("parent", 0),
+            bool(item.get("deleted")),
+            item.get("depth"),
+            item.get("reply_latency"),
+            item.get("sample_weight"),
+        )
+
+
+Record = Union[Story, Comment]
+
+
+def record_from_dict(item: Dict) -> Record:
+    if item.get("type") == Story.type:
+        return Story.from_dict(item)
+    return Comment.from_dict(item)
+
+
+def thread_from_dicts(items: List[Dict]) -> List[Record]:
+    """
+    Records of one [story, *comments] group from the part files. A thread
+    written before the thread metrics existed gets depth, subtree sizes,
+    reply latencies and max_depth recomputed from its parent links; a
+    comment whose parent chain leaves the thread keeps a null depth.
+    """
+    records = [record_from_dict(item) for item in items]
+    legacy = any(item.get("type") != Story.type and "depth" not in item for item in items)
+    if legacy and records and isinstance(records[0], Story):
+        rebuild_thread_metrics(records[0], [record for record in records[1:] if isinstance(record, Comment)])
+    return records
+
+
+def rebuild_thread_metrics(story: Story, comments: List[Comment]) -> None:
+    by_id: Dict[int, Comment] = {comment.id: comment for comment in comments}
+    for comment in comments:
+        chain = []
+        node: Optional[Comment] = comment
+        while node is not None and node.depth is None and node.id not in chain:
+            chain.append(node.id)
+            node = by_id.get(node.parent)
+        if node is not None and node.depth is not None:
+            base = node.depth
+        elif node is None and chain and by_id[chain[-1]].parent == story.id:
+            base = 0
+        else:
+            continue
+        for offset, comment_id in enumerate(reversed(chain), start=1):
+            by_id[comment_id].depth = base + offset
+
+    for comment in comments:
+        comment.descendants = 0
+        comment.reply_latency = None
+    story.reply_latency = None
+    # Deepest first, so each comment's subtree is complete before it is folded into its parent.
+    for comment in sorted(comments, key=lambda comment: -(comment.depth or 0)):
+        parent = story if comment.parent == story.id else by_id.get(comment.parent)
+        if parent is None:
+            continue
+        if parent is not story:
+            parent.descendants += comment.descendants + 1
+        latency = comment.time - parent.time
+        if parent.reply_latency is None or latency < parent.reply_latency:
+            parent.reply_latency = latency
+    story.max_depth = max((comment.depth or 0 for comment in comments), default=0)
+
+
+def record_to_json(record: Record, kids: bool = True) -> str:
+    return json.dumps(record.to_dict(kids), ensure_ascii=False)
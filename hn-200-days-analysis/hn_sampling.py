@@ -0,0 +1,161 @@
+"""
+Stratified sampling for quick HN crawls (--sample).
+
+Days are drawn from the crawl window stratified by weekday, so every
+weekday keeps its share of the sample, and the requested number of stories
+is split evenly across the drawn days. On each day the front-page stories
+not already counted on an earlier day are stratified by posting hour (in
+blocks of HOUR_BLOCK hours, UTC) and score band, and a proportional share of
+every stratum is drawn. When a day has more strata than draws the strata
+are collapsed, first to score band alone and then to the whole day, so the
+day's quota is met exactly rather than overshot by one draw per stratum.
+The sample therefore holds at most the requested number of stories (fewer
+when the drawn days have fewer stories than their quotas), except that each
+drawn day gets at least one.
+
+Each sampled story carries its sampling weight, the number of stories in the
+window it stands for (day weight times stratum weight), and its comments
+inherit it, so weighted counts and averages over a sample estimate the
+full crawl. The draws are seeded per day, so a resumed sample run picks the
+same days and stories again.
+"""
+
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, DefaultDict, Dict, Hashable, List, Set, Tuple
+
+from hn_records import Story
+
+SAMPLE_DIR = "hn_sample"
+SAMPLE_DAYS_PER_WEEKDAY = 4
+HOUR_BLOCK = 4
+# Upper bounds of the score bands; anything above the last is its own band.
+SCORE_BANDS = (10, 50, 100, 500)
+
+
+def allocate(sizes: Dict[Hashable, int], total: int) -> Dict[Hashable, int]:
+    """
+    Split `total` draws across strata in proportion to their sizes (largest
+    remainder), with at least one draw per non-empty stratum and never more
+    than a stratum holds. Draws added by the one-per-stratum rule are taken
+    back from the largest allocations, so the counts sum to `total` unless
+    there are more non-empty strata than draws.
+    """
+    population = sum(sizes.values())
+    if total >= population:
+        return dict(sizes)
+    shares = {key: total * size / population for key, size in sizes.items()}
+    counts = {key: min(size, max(1, int(shares[key]))) for key, size in sizes.items() if size}
+    leftover = total - sum(counts.values())
+    for key in sorted(counts, key=lambda key: (int(shares[key]) - shares[key], key)):
+        if leftover <= 0:
+            break
+        if counts[key] < sizes[key]:
+            counts[key] += 1
+            leftover -= 1
+    while leftover < 0:
+        reducible = [key for key in counts if counts[key] > 1]
+        if not reducible:
+            break
+        counts[max(reducible, key=lambda key: (counts[key], key))] -= 1
+        leftover += 1
+    return counts
+
+
+def score_band(score: int) -> int:
+    for band, upper in enumerate(SCORE_BANDS):
+        if score <= upper:
+            return band
+    return len(SCORE_BANDS)
+
+
+def story_stratum(story: Story) -> Tuple[int, ...]:
+    hour = datetime.fromtimestamp(story.time, timezone.utc).hour if story.time else 0
+    return hour // HOUR_BLOCK, score_band(story.score)
+
+
+def band_stratum(story: Story) -> Tuple[int, ...]:
+    return (score_band(story.score),)
+
+
+def day_stratum(story: Story) -> Tuple[int, ...]:
+    return ()
+
+
+# From finest to coarsest; a day uses the finest with no more strata than draws.
+STRATIFICATIONS: Tuple[Callable[[Story], Tuple[int, ...]], ...] = (story_stratum, band_stratum, day_stratum)
+
+
+class StratifiedSampler:
+    """Picks the days and stories of a sample crawl and sets each story's sample_weight."""
+
+    def __init__(self, stories: int, days: int = 0, seed: int = 0) -> None:
+        self.stories = stories
+        self.days = days
+        self.seed = seed
+        self.day_weights: Dict[str, float] = {}
+        self.day_quotas: Dict[str, int] = {}
+        self.story_quota = 0
+        self.counted: Set[int] = set()
+        self.population = 0
+        self.sampled = 0
+
+    def sample_days(self, days: List[datetime]) -> List[datetime]:
+        """The sampled subset of the window, in the window's order."""
+        by_weekday: DefaultDict[int, List[datetime]] = defaultdict(list)
+        for day in days:
+            by_weekday[day.weekday()].append(day)
+        # A day with no draws would stand for nothing, so never draw more days than stories.
+        wanted = min(self.days or SAMPLE_DAYS_PER_WEEKDAY * 7, self.stories)
+        counts = allocate({weekday: len(group) for weekday, group in by_weekday.items()}, wanted)
+        rng = random.Random(self.seed)
+        chosen = set()
+        for weekday in sorted(counts):
+            group = by_weekday[weekday]
+            picked = rng.sample(group, counts[weekday])
+            chosen.update(picked)
+            for day in picked:
+                self.day_weights[day.strftime("%Y-%m-%d")] = len(group) / counts[weekday]
+        sampled = [day for day in days if day in chosen]
+        self.story_quota, extra = divmod(self.stories, max(len(sampled), 1))
+        for position, day in enumerate(sampled):
+            self.day_quotas[day.strftime("%Y-%m-%d")] = max(1, self.story_quota + (position < extra))
+        return sampled
+
+    def sample_day(self, day_label: str, stories: List[Story]) -> List[Story]:
+        """
+        The sampled stories of one day's front pages, each with its sample_weight
+        set. Days must be passed in crawl order: a story that was on an earlier
+        day's front pages belongs to that day's population, not this one's.
+        """
+        stories = [story for story in stories if story.id not in self.counted]
+        self.counted.update(story.id for story in stories)
+        quota = self.day_quotas.get(day_label, 1)
+        for stratum in STRATIFICATIONS:
+            strata: DefaultDict[Tuple[int, ...], List[Story]] = defaultdict(list)
+            for story in stories:
+                strata[stratum(story)].append(story)
+            if len(strata) <= quota:
+                break
+        counts = allocate({key: len(group) for key, group in strata.items()}, quota)
+        rng = random.Random(f"{self.seed}-{day_label}")
+        day_weight = self.day_weights.get(day_label, 1.0)
+        chosen = set()
+        for key in sorted(counts):
+            group = strata[key]
+            weight = round(day_weight * len(group) / counts[key], 6)
+            for story in rng.sample(group, counts[key]):
+                story.sample_weight = weight
+                chosen.add(story.id)
+        self.population += len(stories)
+        self.sampled += len(chosen)
+        return [story for story in stories if story.id in chosen]
+
+    def describe(self) -> str:
+        low, high = min(self.day_quotas.values(), default=0), max(self.day_quotas.values(), default=0)
+        per_day = str(low) if low == high else f"{low}–{high}"
+        return (
+            f"{len(self.day_weights)} day(s) stratified by weekday, {per_day} stories per day "
+            f"stratified by {HOUR_BLOCK}-hour block and score band (seed {self.seed})"
+        )
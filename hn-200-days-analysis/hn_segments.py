@@ -0,0 +1,138 @@
+"""
+Manifest of the HN part files (segments) in a directory.
+
+Next to the numbered part files sits a small JSON sidecar that lists, for
+every segment, its row count, ID range, time range and the UTC days its
+stories were posted on. It is rewritten atomically whenever a segment is
+added, so readers can pick the segments that may hold the rows they want
+from the manifest alone and skip every other file without opening it.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_FILE = "hn_html_manifest.json"
+
+SEGMENT_NUMBER = re.compile(r"(\d+)\.jsonl$")
+
+# (id, time, is_story) for one row of a segment.
+SegmentRow = Tuple[int, int, bool]
+
+
+def segment_number(filename: str) -> int:
+    match = SEGMENT_NUMBER.search(filename)
+    return int(match.group(1)) if match else 0
+
+
+def summarize_segment(filename: str, rows: Iterable[SegmentRow]) -> Dict:
+    """Manifest entry for one segment, gathered in a single pass over its rows."""
+    count = 0
+    min_id = max_id = min_time = max_time = None
+    days = set()
+    for item_id, item_time, is_story in rows:
+        count += 1
+        if min_id is None or item_id < min_id:
+            min_id = item_id
+        if max_id is None or item_id > max_id:
+            max_id = item_id
+        if item_time:
+            if min_time is None or item_time < min_time:
+                min_time = item_time
+            if max_time is None or item_time > max_time:
+                max_time = item_time
+            if is_story:
+                days.add(datetime.fromtimestamp(item_time, timezone.utc).strftime("%Y-%m-%d"))
+    return {
+        "file": os.path.basename(filename),
+        "rows": count,
+        "min_id": min_id,
+        "max_id": max_id,
+        "min_time": min_time,
+        "max_time": max_time,
+        "days": sorted(days),
+    }
+
+
+def scan_segment(filename: str) -> Dict:
+    def rows() -> Iterable[SegmentRow]:
+        with open(filename, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    item = json.loads(line)
+                    yield item["id"], item.get("time") or 0, item.get("type") == "story"
+
+    return summarize_segment(filename, rows())
+
+
+class SegmentManifest:
+    """Thread-safe view of one directory's manifest."""
+
+    def __init__(self, directory: str = ".") -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.segments: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as handle:
+                for entry in json.load(handle)["segments"]:
+                    self.segments[entry["file"]] = entry
+
+    def sync(self, filenames: List[str]) -> None:
+        """Index part files the manifest does not know yet (e.g. older crawls) and drop vanished ones."""
+        names = {os.path.basename(filename): filename for filename in filenames}
+        with self.lock:
+            stale = [name for name in self.segments if name not in names]
+            missing = [name for name in names if name not in self.segments]
+            if not stale and not missing:
+                return
+            for name in stale:
+                del self.segments[name]
+            for name in missing:
+                self.segments[name] = scan_segment(names[name])
+            self._save()
+
+    def add(self, filename: str, rows: Iterable[SegmentRow]) -> Dict:
+        """Record a freshly written segment (replacing any older entry for the same file)."""
+        entry = summarize_segment(filename, rows)
+        with self.lock:
+            self.segments[entry["file"]] = entry
+            self._save()
+        return entry
+
+    def select(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+    ) -> List[str]:
+        """Paths of the segments that may hold rows in the given time and ID windows."""
+        selected = []
+        with self.lock:
+            entries = sorted(self.segments.values(), key=lambda entry: segment_number(entry["file"]))
+        for entry in entries:
+            if not entry["rows"]:
+                continue
+            if since is not None and entry["max_time"] is not None and entry["max_time"] < since:
+                continue
+            if until is not None and entry["min_time"] is not None and entry["min_time"] > until:
+                continue
+            if min_id is not None and entry["max_id"] < min_id:
+                continue
+            if max_id is not None and entry["min_id"] > max_id:
+                continue
+            selected.append(os.path.join(self.directory, entry["file"]))
+        return selected
+
+    def _save(self) -> None:
+        entries = sorted(self.segments.values(), key=lambda entry: segment_number(entry["file"]))
+        temp_name = f"{self.path}.tmp"
+        with open(temp_name, "w", encoding="utf-8") as handle:
+            json.dump({"segments": entries}, handle, indent=1)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_name, self.path)
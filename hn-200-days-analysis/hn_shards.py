@@ -0,0 +1,149 @@
+"""
+Lease-based work queue for sharded HN crawls, stored in SQLite.
+
+Every day of the crawl window is one row. Worker processes, on this machine
+or on others that share the filesystem, lease a few days at a time, renew
+the lease while they crawl them and mark them completed once the threads are
+in their own part files. A worker that dies simply stops renewing, and its
+days become available to the others when the lease expires. No broker is
+involved: the queue is a single database file guarded by SQLite's own file
+locking, kept in rollback-journal mode because WAL does not work across
+machines on a network filesystem.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Tuple
+
+SHARD_DIR = "hn_shards"
+QUEUE_FILE = "queue.sqlite"
+LEASE_SECONDS = 600.0
+SHARD_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    completed_at REAL
+);
+"""
+
+
+class ShardQueue:
+    """Thread-safe handle on the shared queue database."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def _write(self, sql: str, rows: List[Tuple]) -> int:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = sum(self.conn.execute(sql, row).rowcount for row in rows)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return changed
+
+    def seed(self, days: Iterable[str]) -> int:
+        """Add days to the queue; days that are already queued keep their state."""
+        return self._write("INSERT OR IGNORE INTO days (day) VALUES (?)", [(day,) for day in days])
+
+    def claim(self, owner: str, limit: int = SHARD_DAYS, lease_seconds: float = LEASE_SECONDS) -> List[str]:
+        """Lease up to `limit` unfinished days, newest first, that nobody else holds."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT day FROM days WHERE completed_at IS NULL "
+                    "AND (owner IS NULL OR lease_expires < ?) ORDER BY day DESC LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                days = [row[0] for row in rows]
+                self.conn.executemany(
+                    "UPDATE days SET owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE day = ?",
+                    [(owner, now + lease_seconds, day) for day in days],
+                )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return days
+
+    def renew(self, owner: str, days: List[str], lease_seconds: float = LEASE_SECONDS) -> int:
+        """Extend this owner's leases; returns how many of them it still holds."""
+        expires = time.time() + lease_seconds
+        return self._write(
+            "UPDATE days SET lease_expires = ? WHERE day = ? AND owner = ? AND completed_at IS NULL",
+            [(expires, day, owner) for day in days],
+        )
+
+    def complete(self, owner: str, days: List[str]) -> None:
+        # Recorded even if the lease was lost meanwhile: the work is on disk either
+        # way, and the merge step drops the duplicate threads.
+        now = time.time()
+        self._write(
+            "UPDATE days SET owner = ?, completed_at = ? WHERE day = ? AND completed_at IS NULL",
+            [(owner, now, day) for day in days],
+        )
+
+    def release(self, owner: str, days: List[str]) -> None:
+        """Hand unfinished days back immediately instead of waiting for the lease to run out."""
+        self._write(
+            "UPDATE days SET owner = NULL, lease_expires = NULL WHERE day = ? AND owner = ? AND completed_at IS NULL",
+            [(day, owner) for day in days],
+        )
+
+    def progress(self) -> Tuple[int, int, int]:
+        """(completed, leased, pending) day counts."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT "
+                "SUM(completed_at IS NOT NULL), "
+                "SUM(completed_at IS NULL AND owner IS NOT NULL AND lease_expires >= ?), "
+                "COUNT(*) "
+                "FROM days",
+                (now,),
+            ).fetchone()
+        completed, leased, total = (value or 0 for value in row)
+        return completed, leased, total - completed - leased
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class LeaseHeartbeat:
+    """Background thread that keeps a worker's current leases alive."""
+
+    def __init__(self, work_queue: ShardQueue, owner: str, days: List[str], lease_seconds: float) -> None:
+        self.work_queue = work_queue
+        self.owner = owner
+        self.days = days
+        self.lease_seconds = lease_seconds
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="hn-lease", daemon=True)
+
+    def start(self) -> "LeaseHeartbeat":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.lease_seconds / 3):
+            held = self.work_queue.renew(self.owner, self.days, self.lease_seconds)
+            if held < len(self.days):
+                print(f"Lost the lease on {len(self.days) - held} day(s); another worker may crawl them too.")
@@ -0,0 +1,44 @@
+"""
+Print stored HN items by ID from the part files, using the offset index
+(hn_html_index.sqlite) instead of scanning them. A story comes back with its
+whole thread, a comment with its reply subtree, one JSON object per line.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from hn_index import PartIndex
+from scrape_hn_200_days import list_part_files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up HN items in the part files by ID.")
+    parser.add_argument("ids", type=int, nargs="+", help="story or comment IDs")
+    parser.add_argument("--dir", default=".", help="directory holding the part files")
+    parser.add_argument("--item-only", action="store_true", help="print only the items, without their replies")
+    args = parser.parse_args()
+
+    index = PartIndex(args.dir)
+    # Picks up part files written before the index existed or changed since.
+    index.sync(list_part_files(args.dir))
+    missing = 0
+    started = time.perf_counter()
+    for item_id in args.ids:
+        item = index.get(item_id)
+        items = ([item] if item else []) if args.item_only else index.subtree(item_id)
+        if not items:
+            missing += 1
+            print(f"Item {item_id} is not in any part file.", file=sys.stderr)
+        for found in items:
+            print(json.dumps(found, ensure_ascii=False))
+    elapsed = time.perf_counter() - started
+    print(f"Looked up {len(args.ids)} ID(s) in {elapsed * 1000:.2f} ms.", file=sys.stderr)
+    index.close()
+    if missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Self-contained fake news.ycombinator.com for load-testing the crawler.
+
+Serves /front?day=YYYY-MM-DD&p=N and /item?id=N&p=N in the markup that
+hn_parsing.py reads, filled with deterministic synthetic stories and comment
+trees (the same id always produces the same page). Comment bodies use HN's
+own markup: paragraphs separated by unclosed <p> tags, with some links and
+italics, so parser parity checks see the markup that backends disagree on. Page sizes, latency,
+403/429/5xx injection and comment continuation pages are configurable, so
+crawler throughput can be measured without touching the live site.
+
+    python mock_hn_server.py --port 8765 --latency 0.05 --rate-429 0.01
+    python scrape_hn_200_days.py --base-url http://127.0.0.1:8765 --days 5
+"""
+
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+STORIES_PER_PAGE = 30
+PAGES_PER_DAY = 3
+MEAN_COMMENTS = 40
+MAX_COMMENTS = 2000
+ZERO_COMMENT_SHARE = 0.35
+REPEAT_SHARE = 0.0
+COMMENTS_PER_PAGE = 250
+COMMENT_WORDS = 40
+# Weights of one-, two- and three-paragraph comments, and the shares of paragraphs with a link or italics.
+PARAGRAPH_WEIGHTS = (6, 3, 1)
+LINK_SHARE = 0.15
+ITALIC_SHARE = 0.1
+MAX_DEPTH = 12
+LATENCY_SECONDS = 0.0
+LATENCY_JITTER_SECONDS = 0.0
+RETRY_AFTER_SECONDS = 1
+SEED = 1
+
+WORDS = (
+    "startup launch rust python database latency compiler kernel browser privacy model open source "
+    "funding pricing growth search index cache queue server cloud hardware battery network protocol"
+).split()
+AUTHORS = [f"user{index}" for index in range(500)]
+
+
+class MockConfig:
+    def __init__(
+        self,
+        stories_per_page: int = STORIES_PER_PAGE,
+        pages_per_day: int = PAGES_PER_DAY,
+        mean_comments: int = MEAN_COMMENTS,
+        max_comments: int = MAX_COMMENTS,
+        zero_comment_share: float = ZERO_COMMENT_SHARE,
+        repeat_share: float = REPEAT_SHARE,
+        comments_per_page: int = COMMENTS_PER_PAGE,
+        comment_words: int = COMMENT_WORDS,
+        latency: float = LATENCY_SECONDS,
+        jitter: float = LATENCY_JITTER_SECONDS,
+        rate_403: float = 0.0,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: int = RETRY_AFTER_SECONDS,
+        seed: int = SEED,
+    ) -> None:
+        self.stories_per_page = stories_per_page
+        self.pages_per_day = pages_per_day
+        self.mean_comments = mean_comments
+        self.max_comments = max_comments
+        self.zero_comment_share = zero_comment_share
+        self.repeat_share = repeat_share
+        self.comments_per_page = comments_per_page
+        self.comment_words = comment_words
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_403 = rate_403
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+def iso_time(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class SyntheticSite:
+    """Deterministic stories and comment trees keyed by day and story id."""
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+
+    def rng(self, *key: int) -> random.Random:
+        return random.Random(hash((self.config.seed, *key)))
+
+    def story_ids(self, day: datetime, page: int) -> List[int]:
+        base = (day.toordinal() % 100000) * 1000 + (page - 1) * self.config.stories_per_page
+        ids = [base + index for index in range(self.config.stories_per_page)]
+        repeats = round(self.config.repeat_share * self.config.stories_per_page)
+        if page == self.config.pages_per_day and repeats:
+            # The day's last page ends with the previous day's top stories, as real front pages do.
+            previous = ((day - timedelta(days=1)).toordinal() % 100000) * 1000
+            ids[-repeats:] = [previous + index for index in range(repeats)]
+        return ids
+
+    def story_day(self, story_id: int) -> datetime:
+        ordinal = story_id // 1000
+        today = datetime.now(timezone.utc).date().toordinal()
+        ordinal += (today - ordinal) // 100000 * 100000
+        return datetime.fromordinal(ordinal).replace(tzinfo=timezone.utc)
+
+    def comment_count(self, story_id: int) -> int:
+        rng = self.rng(story_id, 1)
+        if rng.random() < self.config.zero_comment_share:
+            return 0
+        return min(self.config.max_comments, int(rng.expovariate(1 / max(1, self.config.mean_comments))) + 1)
+
+    def words(self, rng: random.Random, count: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(count))
+
+    def comment_html(self, rng: random.Random) -> str:
+        paragraphs = []
+        for _ in range(rng.choices((1, 2, 3), weights=PARAGRAPH_WEIGHTS)[0]):
+            text = escape(self.words(rng, rng.randint(1, self.config.comment_words)))
+            roll = rng.random()
+            if roll < LINK_SHARE:
+                url = f"https://example.com/{rng.choice(WORDS)}?ref=hn&amp;id={rng.randrange(1000)}"
+                text += f' <a href="{url}" rel="nofollow">{url}</a>'
+            elif roll < LINK_SHARE + ITALIC_SHARE:
+                text = f"<i>{text}</i> &#x27;{rng.choice(WORDS)}&#x27; &gt; {rng.choice(WORDS)}"
+            paragraphs.append(text)
+        return "<p>".join(paragraphs)
+
+    def story(self, story_id: int) -> Dict:
+        rng = self.rng(story_id, 2)
+        posted = int(self.story_day(story_id).timestamp()) + rng.randrange(86400)
+        return {
+            "id": story_id,
+            "title": self.words(rng, rng.randint(3, 10)).capitalize(),
+            "url": f"https://example.com/{story_id}",
+            "by": rng.choice(AUTHORS),
+            "time": posted,
+            "score": int(rng.paretovariate(1.2)),
+            "comments": self.comment_count(story_id),
+        }
+
+    def comments(self, story_id: int) -> List[Tuple[int, int, str, int, str]]:
+        """(id, depth, author, time, text HTML) rows in page order."""
+        story = self.story(story_id)
+        rng = self.rng(story_id, 3)
+        rows = []
+        depth = 0
+        for index in range(story["comments"]):
+            depth = rng.randint(0, min(depth + 1, MAX_DEPTH)) if index else 0
+            posted = story["time"] + rng.randrange(1, 86400)
+            text = self.comment_html(rng)
+            rows.append((story_id * 100000 + index, depth, rng.choice(AUTHORS), posted, text))
+        return rows
+
+    def front_page(self, day: datetime, page: int) -> str:
+        rows = []
+        for rank, story_id in enumerate(self.story_ids(day, page), start=(page - 1) * self.config.stories_per_page + 1):
+            story = self.story(story_id)
+            comments = f"{story['comments']}&nbsp;comments" if story["comments"] else "discuss"
+            rows.append(
+                f'<tr class="athing submission" id="{story_id}">'
+                f'<td align="right" valign="top" class="title"><span class="rank">{rank}.</span></td>'
+                f'<td class="title"><span class="titleline"><a href="{story["url"]}">{escape(story["title"])}</a>'
+                f'<span class="sitebit comhead"> (<a href="from?site=example.com"><span class="sitestr">example.com</span></a>)</span>'
+                f"</span></td></tr>\n"
+                f'<tr><td colspan="2"></td><td class="subtext"><span class="subline">'
+                f'<span class="score" id="score_{story_id}">{story["score"]} points</span> by '
+                f'<a href="user?id={story["by"]}" class="hnuser">{story["by"]}</a> '
+                f'<span class="age" title="{iso_time(story["time"])}"><a href="item?id={story_id}">1 day ago</a></span> '
+                f'| <a href="hide?id={story_id}&amp;goto=front">hide</a> | <a href="item?id={story_id}">{comments}</a>'
+                f'</span></td></tr>\n<tr class="spacer" style="height:5px"></tr>\n'
+            )
+        more = ""
+        if page < self.config.pages_per_day:
+            more = (
+                f'<tr class="morespace" style="height:10px"></tr><tr><td colspan="2"></td><td class="title">'
+                f'<a href="front?day={day:%Y-%m-%d}&amp;p={page + 1}" class="morelink" rel="next">More</a></td></tr>'
+            )
+        return page_shell(f'<table border="0" cellpadding="0" cellspacing="0">{"".join(rows)}{more}</table>')
+
+    def item_page(self, story_id: int, page: int) -> str:
+        story = self.story(story_id)
+        rows = self.comments(story_id)
+        per_page = self.config.comments_per_page
+        start = (page - 1) * per_page
+        if page > 1 and start >= len(rows):
+            rows = []
+        else:
+            rows = rows[start : start + per_page]
+        fatitem = (
+            f'<table class="fatitem" border="0"><tr class="athing submission" id="{story_id}">'
+            f'<td class="title"><span class="titleline"><a href="{story["url"]}">{escape(story["title"])}</a></span></td></tr>'
+            f'<tr><td colspan="2"></td><td><span class="commtext">{escape(story["title"])} discussion<p>See <i>the thread</i> below</span></td></tr></table>'
+        )
+        comment_rows = []
+        for comment_id, depth, author, posted, text in rows:
+            comment_rows.append(
+                f'<tr class="athing comtr" id="{comment_id}"><td><table border="0"><tr>'
+                f'<td class="ind" indent="{depth}"><img src="s.gif" height="1" width="{depth * 40}"></td>'
+                f'<td valign="top" class="votelinks"><center><a id="up_{comment_id}" href="vote?id={comment_id}&amp;how=up">'
+                f'<div class="votearrow" title="upvote"></div></a></center></td>'
+                f'<td class="default"><div style="margin-top:2px; margin-bottom:-10px;"><span class="comhead">'
+                f'<a href="user?id={author}" class="hnuser">{author}</a> '
+                f'<span class="age" title="{iso_time(posted)}"><a href="item?id={comment_id}">1 hour ago</a></span>'
+                f'</span></div><br><div class="comment"><span class="commtext c00">{text}</span>'
+                f'<div class="reply"><p><font size="1"><u><a href="reply?id={comment_id}">reply</a></u></font></p></div>'
+                f"</div></td></tr></table></td></tr>\n"
+            )
+        more = ""
+        if start + per_page < story["comments"]:
+            more = f'<tr><td><a href="item?id={story_id}&amp;p={page + 1}" class="morelink" rel="next">More</a></td></tr>'
+        return page_shell(f'{fatitem}<br><table border="0" class="comment-tree">{"".join(comment_rows)}{more}</table>')
+
+
+def page_shell(body: str) -> str:
+    return (
+        '<html lang="en" op="news"><head><meta name="referrer" content="origin">'
+        '<link rel="stylesheet" type="text/css" href="news.css"><title>Hacker News</title></head>'
+        f'<body><center><table id="hnmain" border="0" cellpadding="0" cellspacing="0" width="85%">'
+        f"<tr><td>{body}</td></tr></table></center></body></html>"
+    )
+
+
+class MockHNServer:
+    """The fake site on a ThreadingHTTPServer; start() runs it on a background thread."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockConfig()
+        self.site = SyntheticSite(self.config)
+        self.lock = threading.Lock()
+        self.served: Dict[str, int] = {}
+        self.fault_rng = random.Random(self.config.seed)
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.served[key] = self.served.get(key, 0) + 1
+
+    def injected_status(self) -> Optional[int]:
+        config = self.config
+        with self.lock:
+            roll = self.fault_rng.random()
+            server_error = self.fault_rng.choice((500, 502, 503))
+        if roll < config.rate_403:
+            return 403
+        if roll < config.rate_403 + config.rate_429:
+            return 429
+        if roll < config.rate_403 + config.rate_429 + config.rate_5xx:
+            return server_error
+        return None
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                config = server.config
+                if config.latency or config.jitter:
+                    time.sleep(config.latency + random.uniform(0, config.jitter))
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                status = server.injected_status()
+                if status:
+                    server.count(str(status))
+                    headers = {"Retry-After": str(config.retry_after)} if status == 429 else {}
+                    self.respond(status, f"<html><body>{status}</body></html>", headers)
+                    return
+                try:
+                    page = int(query.get("p", ["1"])[0])
+                    if parts.path == "/front":
+                        body = server.site.front_page(datetime.strptime(query["day"][0], "%Y-%m-%d"), page)
+                    elif parts.path == "/item":
+                        body = server.site.item_page(int(query["id"][0]), page)
+                    else:
+                        body = page_shell("")
+                except (KeyError, ValueError):
+                    server.count("400")
+                    self.respond(400, "<html><body>Bad request</body></html>")
+                    return
+                server.count(parts.path.strip("/") or "index")
+                self.respond(200, body)
+
+            def respond(self, status: int, body: str, headers: Optional[Dict[str, str]] = None) -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "MockHNServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-hn", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--stories-per-page", type=int, default=STORIES_PER_PAGE)
+    parser.add_argument("--pages-per-day", type=int, default=PAGES_PER_DAY)
+    parser.add_argument("--mean-comments", type=int, default=MEAN_COMMENTS, help="mean comments on stories that have any")
+    parser.add_argument("--max-comments", type=int, default=MAX_COMMENTS)
+    parser.add_argument("--zero-comment-share", type=float, default=ZERO_COMMENT_SHARE)
+    parser.add_argument(
+        "--repeat-share",
+        type=float,
+        default=REPEAT_SHARE,
+        help="share of each day's last front page taken by stories repeated from the previous day",
+    )
+    parser.add_argument(
+        "--comments-per-page", type=int, default=COMMENTS_PER_PAGE, help="comments per item page before a More link"
+    )
+    parser.add_argument("--comment-words", type=int, default=COMMENT_WORDS, help="mean words per comment")
+    parser.add_argument("--latency", type=float, default=LATENCY_SECONDS, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=LATENCY_JITTER_SECONDS, help="extra random latency, up to this")
+    parser.add_argument("--rate-403", type=float, default=0.0, help="share of requests answered with 403")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="share of requests answered with 500/502/503")
+    parser.add_argument("--retry-after", type=int, default=RETRY_AFTER_SECONDS, help="Retry-After sent with 429s")
+    parser.add_argument("--seed", type=int, default=SEED)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        stories_per_page=args.stories_per_page,
+        pages_per_day=args.pages_per_day,
+        mean_comments=args.mean_comments,
+        max_comments=args.max_comments,
+        zero_comment_share=args.zero_comment_share,
+        repeat_share=args.repeat_share,
+        comments_per_page=args.comments_per_page,
+        comment_words=args.comment_words,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_403=args.rate_403,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a synthetic Hacker News for crawler load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockHNServer(config_from_args(args), args.host, args.port)
+    print(f"Mock Hacker News listening on {server.url} (Ctrl-C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Served: {dict(sorted(server.served.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Rebuild the hn_html_part*.jsonl files from the raw page archive written by
+`scrape_hn_200_days.py --archive`, without touching the network. Front and
+item pages are parsed on a process pool so the work spreads across all cores.
+"""
+
+import argparse
+import os
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import DefaultDict, List, Set, Tuple
+
+from hn_archive import ARCHIVE_DIR, PageArchive, read_object
+from hn_journal import CrawlJournal
+from hn_parsing import DEFAULT_PARSER_BACKEND, PARSER_BACKENDS, parse_front_page, set_parser_backend
+from hn_records import Story
+from scrape_hn_200_days import BatchWriter, ThreadResult, build_thread_records, install_staged_parts, thread_records
+
+REPARSE_STAGING_DIR = "reparse_staging"
+THREAD_CHUNKSIZE = 8
+
+
+def parse_archived_day(job: Tuple[str, List[str]]) -> List[Story]:
+    day_label, paths = job
+    day = datetime.strptime(day_label, "%Y-%m-%d")
+    stories: List[Story] = []
+    for path in paths:
+        page_stories, _ = parse_front_page(read_object(path), day)
+        stories.extend(page_stories)
+    return stories
+
+
+def parse_archived_thread(job: Tuple[Story, List[str]]) -> ThreadResult:
+    meta, paths = job
+    if not paths:
+        return thread_records(meta, "", [], [])
+    return build_thread_records(meta, [read_object(path) for path in paths])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-derive the HN part files from the raw page archive.")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_PARSER_BACKEND)
+    args = parser.parse_args()
+
+    archive = PageArchive(args.archive_dir)
+    front_pages: DefaultDict[str, List[Tuple[int, str]]] = defaultdict(list)
+    item_pages: DefaultDict[int, List[Tuple[int, str]]] = defaultdict(list)
+    for entry in archive.entries():
+        path = archive.object_path(entry["sha256"])
+        if entry["kind"] == "front":
+            front_pages[entry["day"]].append((entry["page"], path))
+        elif entry["kind"] == "item":
+            item_pages[entry["story_id"]].append((entry.get("page", 1), path))
+    if not front_pages:
+        print(f"No archived front pages found in {args.archive_dir}/.")
+        return
+
+    day_jobs = [(day, [path for _, path in sorted(pages)]) for day, pages in sorted(front_pages.items(), reverse=True)]
+    print(f"Reparsing {len(day_jobs)} day(s) and {len(item_pages):,} threads with {args.workers} worker(s)...")
+    started = time.time()
+
+    shutil.rmtree(REPARSE_STAGING_DIR, ignore_errors=True)
+    os.makedirs(REPARSE_STAGING_DIR)
+    writer = BatchWriter(directory=REPARSE_STAGING_DIR)
+    missing = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=set_parser_backend,
+        initargs=(args.parser,),
+    ) as pool:
+        metas: List[Story] = []
+        seen: Set[int] = set()
+        for day_stories in pool.map(parse_archived_day, day_jobs):
+            for meta in day_stories:
+                if meta.id not in seen:
+                    seen.add(meta.id)
+                    metas.append(meta)
+        thread_jobs = [(meta, [path for _, path in sorted(item_pages.get(meta.id, []))]) for meta in metas]
+        missing = sum(1 for _, paths in thread_jobs if not paths)
+        for story_record, comments in pool.map(parse_archived_thread, thread_jobs, chunksize=THREAD_CHUNKSIZE):
+            writer.add([story_record, *comments])
+    writer.close()
+
+    journal = CrawlJournal()
+    install_staged_parts(REPARSE_STAGING_DIR, journal)
+    journal.close()
+    print(
+        f"REPARSE COMPLETE! {len(metas):,} stories ({missing:,} without an archived thread), "
+        f"{writer.saved_items:,} items in {time.time() - started:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
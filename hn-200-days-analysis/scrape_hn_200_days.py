@@ -3,71 +3,242 @@ Scrape ~200 days of Hacker News activity directly from news.ycombinator.com
 by walking historical front pages and fetching every story discussion thread.
 """
 
+import argparse
+import asyncio
+from collections import deque
+import functools
+import glob
 import json
+import math
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
 import threading
 import time
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
-from urllib.parse import urljoin
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 import requests
-from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+except ImportError:  # Only needed for the asyncio fetch engine.
+    aiohttp = None
+
+from hn_archive import ARCHIVE_DIR, PageArchive
+from hn_dedup import SeenStories
+from hn_http2 import Http2Session
+from hn_index import INDEX_FILE, PartIndex
+from hn_journal import JOURNAL_FILE, CrawlJournal, Validators
+from hn_metrics import METRICS_INTERVAL_SECONDS, CrawlMetrics
+from hn_planner import CrawlPlanner
+from hn_ratelimit import AdaptiveRateLimiter
+from hn_sampling import SAMPLE_DIR, StratifiedSampler
+from hn_segments import MANIFEST_FILE, SegmentManifest
+from hn_shards import LEASE_SECONDS, QUEUE_FILE, SHARD_DAYS, SHARD_DIR, LeaseHeartbeat, ShardQueue
+from hn_records import Comment, Record, Story, kids_array, record_to_json, thread_from_dicts
+from hn_parsing import (
+    DEFAULT_PARSER_BACKEND,
+    PARSER_BACKENDS,
+    RawThreadPages,
+    more_link_page,
+    new_thread_parse,
+    parse_front_page,
+    parse_item_pages,
+    parse_thread_pages,
+    set_parser_backend,
+    streaming_enabled,
+    unpack_item_page,
+)
+
+# The retry layer is shared with the other scrapers at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper_retry import HostBreakers, RetryBudget, RetryPolicy  # noqa: E402
 
 
 BASE_NEWS_URL = "https://news.ycombinator.com"
 FRONT_ENDPOINT = f"{BASE_NEWS_URL}/front"
 ITEM_ENDPOINT = f"{BASE_NEWS_URL}/item"
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36"
+REQUEST_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1",
+}
 
 DAYS_OF_HISTORY = 200
-FRONT_DELAY_SECONDS = 0.5
 THREAD_WORKERS = 16
 REQUEST_TIMEOUT = 15
-RETRY_LIMIT = 3
 BATCH_SIZE = 10000
-FRONT_MAX_RETRIES = 5
+WRITER_QUEUE_BATCHES = 2
+STORY_QUEUE_SIZE = THREAD_WORKERS * 8
+MAX_IN_FLIGHT = THREAD_WORKERS * 2
+QUEUE_POLL_SECONDS = 0.2
+FETCH_ENGINE = "threads"
+DISCOVERY_WORKERS = 4
+HTTP_TRANSPORTS = ("requests", "http2")
+HTTP_TRANSPORT = "requests"
+HTTP2_CLIENTS = 2
+WARM_UP = True
+TREE_FORMATS = ("kids", "parent")
+TREE_FORMAT = "kids"
+SKIP_EMPTY_THREADS = True
+ASYNC_MAX_IN_FLIGHT = 256
+ASYNC_CONNECTIONS_PER_HOST = 8
+STREAM_CHUNK_BYTES = 64 * 1024
+CONTINUATION_WORKERS = 4
+MAX_SPECULATIVE_PAGES = 8
+# Opt-in: the pool needs each thread's raw pages in memory, which turns off
+# the constant-memory streaming parser (see ProcessParseStage).
+PARSE_WORKERS = 0
+PART_PREFIX = "hn_html_part"
+REFRESH_STAGING_DIR = "refresh_staging"
+MERGE_STAGING_DIR = "merge_staging"
+PART_BACKUP_DIR = "parts_backup"
+
+ThreadResult = Tuple[Story, List[Comment]]
+HttpSession = Union[requests.Session, Http2Session]
 
 thread_local = threading.local()
+rate_limiter = AdaptiveRateLimiter()
+retry_budget = RetryBudget()
+retry_policy = RetryPolicy(retry_budget)
+breakers = HostBreakers()
+metrics = CrawlMetrics()
+parse_stage: Optional["ProcessParseStage"] = None
+http2_sessions: List[Http2Session] = []
+discovery_executor: Optional[ThreadPoolExecutor] = None
+connection_sources: List[Callable[[], Tuple[int, int]]] = []
+warmed_up = False
+session_lock = threading.Lock()
 
 
-def build_session() -> requests.Session:
+def build_session() -> HttpSession:
+    if HTTP_TRANSPORT == "http2":
+        return shared_http2_session()
     session = requests.Session()
-    retry = Retry(
-        total=RETRY_LIMIT,
-        read=RETRY_LIMIT,
-        connect=RETRY_LIMIT,
-        backoff_factor=0.5,
-        status_forcelist=(429, 500, 502, 503, 504),
-    )
+    # No transport-level retries: retry_policy is the only retry layer.
     adapter = HTTPAdapter(
-        max_retries=retry,
+        max_retries=0,
         pool_connections=THREAD_WORKERS * 2,
         pool_maxsize=THREAD_WORKERS * 4,
     )
     session.mount("https://", adapter)
-    session.headers.update(
-        {
-            "User-Agent": USER_AGENT,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "DNT": "1",
-            "Upgrade-Insecure-Requests": "1",
-        }
-    )
+    session.mount("http://", adapter)
+    session.headers.update(REQUEST_HEADERS)
+    with session_lock:
+        connection_sources.append(functools.partial(pool_connection_counts, session))
+    warm_up(session)
+    return session
+
+
+def shared_http2_session() -> Http2Session:
+    """Hand out the process-wide HTTP/2 clients round-robin, opening them on first use."""
+    with session_lock:
+        if len(http2_sessions) < HTTP2_CLIENTS:
+            session = Http2Session(REQUEST_HEADERS, REQUEST_TIMEOUT)
+            connection_sources.append(session.connection_counts)
+        else:
+            session = http2_sessions.pop(0)
+        http2_sessions.append(session)
+    warm_up(session)
+    return session
+
+
+def warm_up(session: HttpSession) -> None:
+    """Visit the homepage once per process, as a browser would before following deep links."""
+    global warmed_up
+    with session_lock:
+        if warmed_up or not WARM_UP:
+            return
+        warmed_up = True
     try:
-        session.get(BASE_NEWS_URL, timeout=REQUEST_TIMEOUT)
+        session.get(BASE_NEWS_URL, timeout=REQUEST_TIMEOUT).close()
     except requests.RequestException:
         pass
-    return session
 
 
-def get_thread_session() -> requests.Session:
+def get_discovery_executor() -> ThreadPoolExecutor:
+    """Front-page fetch threads (one session each), shared by every pipeline run in this process."""
+    global discovery_executor
+    if discovery_executor is None:
+        discovery_executor = ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS, thread_name_prefix="hn-front")
+    return discovery_executor
+
+
+def configure_discovery(workers: int) -> None:
+    global DISCOVERY_WORKERS
+    DISCOVERY_WORKERS = max(1, workers)
+
+
+def pool_connection_counts(session: requests.Session) -> Tuple[int, int]:
+    opened = sent = 0
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+    return opened, sent
+
+
+def connection_stats() -> Tuple[int, int]:
+    """(connections opened, requests sent) across every HTTP client this process has created."""
+    with session_lock:
+        sources = list(connection_sources)
+    opened = sent = 0
+    for source in sources:
+        source_opened, source_sent = source()
+        opened += source_opened
+        sent += source_sent
+    return opened, sent
+
+
+def describe_connection_reuse() -> str:
+    opened, sent = connection_stats()
+    return f"{sent:,} requests over {opened:,} connection(s), {sent / max(opened, 1):.1f} per connection"
+
+
+def configure_transport(name: str, warm_up_enabled: bool = WARM_UP) -> None:
+    global HTTP_TRANSPORT, WARM_UP
+    HTTP_TRANSPORT = name
+    WARM_UP = warm_up_enabled
+
+
+def configure_planner(fetch_empty: bool) -> None:
+    global SKIP_EMPTY_THREADS
+    SKIP_EMPTY_THREADS = not fetch_empty
+
+
+def configure_tree_format(name: str) -> None:
+    """Write every record's kids array ("kids"), or let each comment's parent and depth carry the tree ("parent")."""
+    global TREE_FORMAT
+    TREE_FORMAT = name
+
+
+def configure_base_url(base_url: str) -> None:
+    """Point the crawler at another host, e.g. mock_hn_server.py for load tests."""
+    global BASE_NEWS_URL, FRONT_ENDPOINT, ITEM_ENDPOINT
+    BASE_NEWS_URL = base_url.rstrip("/")
+    FRONT_ENDPOINT = f"{BASE_NEWS_URL}/front"
+    ITEM_ENDPOINT = f"{BASE_NEWS_URL}/item"
+
+
+def get_thread_session() -> HttpSession:
     session = getattr(thread_local, "session", None)
     if session is None:
         session = build_session()
@@ -75,37 +246,39 @@ def get_thread_session() -> requests.Session:
     return session
 
 
-def parse_iso_timestamp(value: str) -> int:
-    cleaned = value
-    if cleaned.endswith("Z"):
-        cleaned = cleaned.replace("Z", "+00:00")
-    if "+" not in cleaned and "-" not in cleaned[10:]:
-        cleaned += "+00:00"
-    dt = datetime.fromisoformat(cleaned)
-    return int(dt.timestamp())
-
-
-def parse_age(span: Optional[BeautifulSoup]) -> int:
-    if span and span.has_attr("title"):
-        try:
-            return parse_iso_timestamp(span["title"])
-        except ValueError:
-            pass
-    return int(time.time())
-
-
-def parse_comment_count(text: str) -> int:
-    stripped = text.strip()
-    if not stripped or stripped == "discuss":
-        return 0
-    for token in stripped.split():
-        if token.isdigit():
-            return int(token)
-    return 0
+def limited_get(session: HttpSession, url: str, kind: str = "item", **kwargs) -> requests.Response:
+    """
+    One GET attempt through the host's circuit breaker and the shared rate
+    limiter, reporting the outcome back to them, the retry budget and the metrics.
+    """
+    breaker = breakers.for_url(url)
+    breaker.acquire()
+    rate_limiter.acquire()
+    retry_budget.deposit()
+    started = time.monotonic()
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+    except requests.RequestException:
+        latency = time.monotonic() - started
+        rate_limiter.record(None, latency)
+        breaker.record(None)
+        metrics.observe_request(kind, latency)
+        raise
+    latency = time.monotonic() - started
+    rate_limiter.record(response.status_code, latency, response.headers.get("Retry-After"))
+    breaker.record(response.status_code)
+    metrics.observe_request(kind, latency)
+    if not kwargs.get("stream"):
+        metrics.observe_bytes(kind, response.raw.tell())
+    return response
 
 
-def normalize_story_url(url: str) -> str:
-    return urljoin(f"{BASE_NEWS_URL}/", url)
+def retry_delay(attempt: int, status: Optional[int]) -> Optional[float]:
+    """The retry policy's backoff for a failed attempt, counting the retry in the metrics if one is made."""
+    delay = retry_policy.backoff(attempt, status)
+    if delay is not None:
+        metrics.observe_retry(status)
+    return delay
 
 
 def daterange(end_date: datetime, days_back: int) -> Iterable[datetime]:
@@ -113,266 +286,1456 @@ def daterange(end_date: datetime, days_back: int) -> Iterable[datetime]:
         yield end_date - timedelta(days=offset)
 
 
-def fetch_front_page(session: requests.Session, day: datetime, page: int) -> Optional[str]:
+def fetch_front_page(
+    session: HttpSession,
+    day: datetime,
+    page: int,
+    archive: Optional[PageArchive] = None,
+) -> Optional[str]:
     params = {"day": day.strftime("%Y-%m-%d")}
     if page > 1:
         params["p"] = page
-    for attempt in range(1, FRONT_MAX_RETRIES + 1):
+    for attempt in range(1, retry_policy.attempts + 1):
+        status = None
         try:
-            response = session.get(FRONT_ENDPOINT, params=params, timeout=REQUEST_TIMEOUT)
-            if response.status_code == 200:
+            response = limited_get(session, FRONT_ENDPOINT, "front", params=params)
+            status = response.status_code
+            if status == 200:
+                if archive:
+                    archive.store("front", response.url, response.text, day=params["day"], page=page)
                 return response.text
-            if response.status_code == 403:
-                wait = FRONT_DELAY_SECONDS * attempt * 4
-                print(f"Front page blocked (403) for {params}, sleeping {wait:.1f}s before retry.")
-                time.sleep(wait)
-                continue
-            print(f"Front page fetch failed ({response.status_code}) for {params}")
-            break
+            print(f"Front page fetch failed ({status}) for {params} (attempt {attempt}).")
         except requests.RequestException as exc:
-            wait = FRONT_DELAY_SECONDS * attempt * 2
-            print(f"Front page fetch exception for {params}: {exc}. Retrying in {wait:.1f}s")
-            time.sleep(wait)
+            print(f"Front page fetch exception for {params} (attempt {attempt}): {exc}")
+        delay = retry_delay(attempt, status)
+        if delay is None:
+            break
+        time.sleep(delay)
     return None
 
 
-def parse_front_page(html: str, day: datetime) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    stories: List[Dict] = []
-    for row in soup.select("tr.athing"):
-        story_id = row.get("id")
-        if not story_id:
-            continue
-        title_link = row.select_one(".titleline > a")
-        if not title_link:
-            continue
-        subtext = row.find_next_sibling("tr")
-        score = 0
-        author = None
-        timestamp = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
-        descendants = 0
-        if subtext:
-            score_span = subtext.select_one("span.score")
-            if score_span:
-                parts = score_span.text.split()
-                if parts:
-                    try:
-                        score = int(parts[0])
-                    except ValueError:
-                        score = 0
-            author_link = subtext.select_one("a.hnuser")
-            if author_link:
-                author = author_link.text.strip()
-            age_span = subtext.select_one("span.age")
-            timestamp = parse_age(age_span)
-            for link in subtext.select("a"):
-                href = link.get("href", "")
-                if href.startswith("item?id="):
-                    descendants = parse_comment_count(link.text)
-        stories.append(
-            {
-                "id": int(story_id),
-                "type": "story",
-                "title": title_link.get_text(strip=True),
-                "url": normalize_story_url(title_link.get("href", "")),
-                "by": author,
-                "time": timestamp,
-                "score": score,
-                "text": "",
-                "descendants": descendants,
-                "kids": [],
-            }
+def item_url(story_id: int, page: int = 1) -> str:
+    if page > 1:
+        return f"{ITEM_ENDPOINT}?id={story_id}&p={page}"
+    return f"{ITEM_ENDPOINT}?id={story_id}"
+
+
+def thread_records(meta: Story, story_text: str, comments: List[Comment], story_kids: List[int]) -> ThreadResult:
+    story_record = meta.copy()
+    story_record.text = story_text
+    story_record.descendants = len(comments)
+    story_record.kids = kids_array(story_kids)
+    story_record.max_depth = max((comment.depth for comment in comments), default=0)
+    first_reply = min((comment.time for comment in comments if comment.depth == 1), default=None)
+    story_record.reply_latency = first_reply - meta.time if first_reply is not None else None
+    return story_record, comments
+
+
+def build_thread_records(meta: Story, pages: List[str]) -> ThreadResult:
+    return thread_records(meta, *parse_item_pages(pages, meta.id))
+
+
+class ThreadFetchFailed(Exception):
+    """
+    One of a thread's item pages could not be fetched within the retry policy.
+    The story is left out of the part files and the journal, so its day stays
+    incomplete and the next run fetches it again.
+    """
+
+
+def failed_thread(meta: Story) -> ThreadFetchFailed:
+    print(f"Thread fetch failed for story {meta.id} after retries.")
+    return ThreadFetchFailed(meta.id)
+
+
+def conditional_headers(validators: Optional[Validators]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if validators:
+        etag, last_modified = validators
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def continuation_pages(meta: Story, thread, next_page: int) -> List[int]:
+    """
+    Guess how many more pages a thread spans from the front page's comment
+    count and the size of its first page, so they can be requested together.
+    """
+    per_page = max(1, thread.first_page_comments)
+    remaining = meta.descendants - thread.comment_count
+    count = min(MAX_SPECULATIVE_PAGES, max(1, math.ceil(remaining / per_page)))
+    return list(range(next_page, next_page + count))
+
+
+def add_continuation_pages(meta: Story, thread, pages: List[int], bodies: List[Optional[str]]) -> Optional[int]:
+    """Feed fetched pages in order while each one links to the next; returns the next page still to fetch."""
+    for page, body in zip(pages, bodies):
+        if body is None:
+            # A thread missing pages would be journalled as done; fail it so it is fetched again.
+            print(f"Thread {meta.id}: page {page} could not be fetched.")
+            raise failed_thread(meta)
+        thread.add_page(body)
+        if not thread.more_link:
+            return None
+    return more_link_page(thread.more_link)
+
+
+def init_parse_worker(backend: str) -> None:
+    # Ctrl-C is handled by the parent, which drains in-flight threads before exiting.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    set_parser_backend(backend)
+
+
+class ProcessParseStage:
+    """
+    Item-page parsing on a pool of worker processes, so parsing is no longer
+    serialised by the GIL behind the fetch threads. Fetchers hand over the
+    raw page bytes and get back compact packed rows.
+
+    A worker needs a thread's pages whole, so the fetch threads buffer them
+    instead of streaming them through the constant-memory parser. The stage
+    is therefore off unless --parse-workers asks for it; enable it when
+    parsing, not the network, is the bottleneck (benchmark_hn_crawl.py
+    reports the CPU time and peak RSS of both setups).
+    """
+
+    def __init__(self, workers: int, backend: str) -> None:
+        self.workers = workers
+        # Workers are started on demand from fetch threads; forking a
+        # multi-threaded process can deadlock the child, so spawn them.
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_parse_worker,
+            initargs=(backend,),
         )
-    return stories
 
+    def submit(self, story_id: int, pages: List[bytes]) -> Future:
+        return self.pool.submit(parse_thread_pages, story_id, pages)
 
-def extract_story_text(soup: BeautifulSoup) -> str:
-    block = soup.select_one("table.fatitem span.commtext")
-    if block:
-        return block.decode_contents().strip()
-    return ""
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
 
 
-def parse_comment_tree(soup: BeautifulSoup, story_id: int) -> Tuple[List[Dict], DefaultDict[int, List[int]]]:
-    comments: List[Dict] = []
-    kids_map: DefaultDict[int, List[int]] = defaultdict(list)
-    stack: List[int] = []
+def start_parse_stage(workers: int, backend: str) -> None:
+    global parse_stage
+    parse_stage = ProcessParseStage(workers, backend) if workers > 0 else None
 
-    for row in soup.select("tr.comtr"):
-        comment_id = row.get("id")
-        if not comment_id:
-            continue
-        try:
-            numeric_id = int(comment_id)
-        except ValueError:
-            continue
 
-        indent_img = row.select_one("td.ind img")
-        depth = 0
-        if indent_img and indent_img.has_attr("width"):
-            try:
-                depth = int(indent_img["width"]) // 40
-            except ValueError:
-                depth = 0
+def stop_parse_stage() -> None:
+    global parse_stage
+    if parse_stage:
+        parse_stage.close()
+        parse_stage = None
 
-        while len(stack) > depth:
-            stack.pop()
-        parent_id = story_id if not stack else stack[-1]
-        stack.append(numeric_id)
 
-        default_td = row.select_one("td.default")
-        if not default_td:
-            continue
-        comm_text = default_td.select_one("span.commtext")
-        text_html = comm_text.decode_contents().strip() if comm_text else ""
-        deleted = text_html == "[deleted]"
-
-        user_link = default_td.select_one("a.hnuser")
-        author = user_link.text.strip() if user_link else None
-        age_span = default_td.select_one("span.age")
-        timestamp = parse_age(age_span)
-        score_span = default_td.select_one("span.score")
-        score = 0
-        if score_span:
-            parts = score_span.text.split()
-            if parts:
-                try:
-                    score = int(parts[0])
-                except ValueError:
-                    score = 0
-
-        comment_record = {
-            "id": numeric_id,
-            "type": "comment",
-            "time": timestamp,
-            "by": author,
-            "score": score,
-            "title": "",
-            "url": "",
-            "text": "" if deleted else text_html,
-            "descendants": 0,
-            "kids": [],
-            "parent": parent_id,
-            "deleted": deleted,
-        }
-        comments.append(comment_record)
-        kids_map[parent_id].append(numeric_id)
-
-    for comment in comments:
-        comment["kids"] = kids_map.get(comment["id"], [])
-        comment["descendants"] = len(comment["kids"])
-
-    return comments, kids_map
-
-
-def fetch_story_thread(meta: Dict) -> Tuple[Dict, List[Dict]]:
-    session = get_thread_session()
-    item_url = f"{ITEM_ENDPOINT}?id={meta['id']}"
-    for attempt in range(RETRY_LIMIT):
-        try:
-            response = session.get(item_url, timeout=REQUEST_TIMEOUT)
-            if response.status_code != 200:
-                time.sleep(0.5 * (attempt + 1))
-                continue
-            soup = BeautifulSoup(response.text, "html.parser")
-            story_text = extract_story_text(soup)
-            comments, kids_map = parse_comment_tree(soup, meta["id"])
-            story_record = dict(meta)
-            story_record["text"] = story_text
-            story_record["descendants"] = len(comments)
-            story_record["kids"] = kids_map.get(meta["id"], [])
-            return story_record, comments
-        except requests.RequestException as exc:
-            print(f"Thread fetch error for story {meta['id']} (attempt {attempt + 1}): {exc}")
-            time.sleep(0.5 * (attempt + 1))
-    print(f"Thread fetch failed for story {meta['id']} after retries.")
-    story_record = dict(meta)
-    story_record["text"] = ""
-    story_record["descendants"] = 0
-    story_record["kids"] = []
-    return story_record, []
-
-
-def flush_batch(filename: str, payload: List[Dict]) -> None:
-    with open(filename, "w", encoding="utf-8") as handle:
-        for item in payload:
-            handle.write(json.dumps(item, ensure_ascii=False) + "\n")
+def parsed_thread_records(meta: Story, thread) -> ThreadResult:
+    story_text, comments, story_kids = thread.finish()
+    metrics.observe_parse(thread.cpu_seconds, len(comments) + 1)
+    return thread_records(meta, story_text, comments, story_kids)
 
 
-def main() -> None:
-    front_session = build_session()
-    end_date = datetime.now(timezone.utc).date()
-    start_date = end_date - timedelta(days=DAYS_OF_HISTORY - 1)
-    total_days = (end_date - start_date).days + 1
+def packed_thread_records(meta: Story, packed: bytes) -> ThreadResult:
+    cpu_seconds, (story_text, comments, story_kids) = unpack_item_page(packed)
+    metrics.observe_parse(cpu_seconds, len(comments) + 1)
+    return thread_records(meta, story_text, comments, story_kids)
 
-    batch: List[Dict] = []
-    batch_num = 1
-    saved_items = 0
 
-    for index, day in enumerate(daterange(end_date, total_days), start=1):
-        current_day = day
-        day_label = current_day.strftime("%Y-%m-%d")
-        page = 1
-        day_stories: List[Dict] = []
+class ThreadFetchEngine:
+    """
+    Fetches item threads on a pool of threads, one requests session each (or
+    the shared clients of the HTTP/2 transport).
+    Continuation pages of long threads go to a small side pool so they load
+    concurrently while the thread's worker parses them in order.
+    """
 
-        while True:
-            html = fetch_front_page(front_session, current_day, page)
-            if not html:
-                break
-            page_stories = parse_front_page(html, current_day)
-            if not page_stories:
+    max_in_flight = MAX_IN_FLIGHT
+
+    def __init__(self, journal: Optional[CrawlJournal] = None, archive: Optional[PageArchive] = None) -> None:
+        self.journal = journal
+        self.archive = archive
+        self.executor = ThreadPoolExecutor(max_workers=THREAD_WORKERS)
+        self.page_executor = ThreadPoolExecutor(max_workers=CONTINUATION_WORKERS)
+
+    def submit(self, meta: Story, validators: Optional[Validators] = None) -> Future:
+        return self.executor.submit(self.fetch_story_thread, meta, validators)
+
+    def fetch_story_thread(self, meta: Story, validators: Optional[Validators] = None) -> Optional[ThreadResult]:
+        """Fetch and parse one thread; returns None when a conditional request says it is unchanged."""
+        session = get_thread_session()
+        url = item_url(meta.id)
+        stream = streaming_enabled() and parse_stage is None
+        headers = conditional_headers(validators)
+        thread = None
+        for attempt in range(1, retry_policy.attempts + 1):
+            status = None
+            try:
+                with limited_get(session, url, stream=stream, headers=headers) as response:
+                    status = response.status_code
+                    if status == 304:
+                        return None
+                    if status == 200:
+                        if self.journal:
+                            self.journal.remember_validators(
+                                meta.id, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                            )
+                        page_thread = RawThreadPages() if parse_stage else new_thread_parse(meta.id)
+                        if stream:
+                            chunks = response.iter_content(chunk_size=STREAM_CHUNK_BYTES, decode_unicode=True)
+                            if self.archive:
+                                chunks = self.archive.tee("item", url, chunks, story_id=meta.id, page=1)
+                            page_thread.add_page(chunks)
+                            metrics.observe_bytes("item", response.raw.tell())
+                        else:
+                            body = response.content if parse_stage else response.text
+                            if self.archive:
+                                self.archive.store("item", url, body, story_id=meta.id, page=1)
+                            page_thread.add_page(body)
+                        thread = page_thread
+                        break
+                    print(f"Thread fetch failed ({status}) for story {meta.id} (attempt {attempt}).")
+            except requests.RequestException as exc:
+                print(f"Thread fetch error for story {meta.id} (attempt {attempt}): {exc}")
+            delay = retry_delay(attempt, status)
+            if delay is None:
                 break
-            day_stories.extend(page_stories)
-            soup = BeautifulSoup(html, "html.parser")
-            more_link = soup.select_one("a.morelink")
-            if more_link:
-                page += 1
-                time.sleep(FRONT_DELAY_SECONDS)
-            else:
+            time.sleep(delay)
+        if thread is None:
+            raise failed_thread(meta)
+
+        next_page = more_link_page(thread.more_link)
+        while next_page:
+            pages = continuation_pages(meta, thread, next_page)
+            futures = [self.page_executor.submit(self.fetch_item_page, meta.id, page) for page in pages]
+            next_page = add_continuation_pages(meta, thread, pages, (future.result() for future in futures))
+            for future in futures:
+                future.cancel()
+        if parse_stage:
+            return packed_thread_records(meta, parse_stage.submit(meta.id, thread.bodies).result())
+        return parsed_thread_records(meta, thread)
+
+    def fetch_item_page(self, story_id: int, page: int) -> Optional[Union[str, bytes]]:
+        session = get_thread_session()
+        url = item_url(story_id, page)
+        for attempt in range(1, retry_policy.attempts + 1):
+            status = None
+            try:
+                response = limited_get(session, url)
+                status = response.status_code
+                if status == 200:
+                    body = response.content if parse_stage else response.text
+                    if self.archive:
+                        self.archive.store("item", url, body, story_id=story_id, page=page)
+                    return body
+            except requests.RequestException as exc:
+                print(f"Thread fetch error for story {story_id} page {page} (attempt {attempt}): {exc}")
+            delay = retry_delay(attempt, status)
+            if delay is None:
                 break
+            time.sleep(delay)
+        return None
 
-        if not day_stories:
-            print(f"Day {index}/{total_days} ({day_label}): no stories found.")
-            continue
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.page_executor.shutdown(wait=True, cancel_futures=True)
 
-        story_ids = [story["id"] for story in day_stories]
-        print(
-            f"Day {index}/{total_days} ({day_label}): "
-            f"{len(day_stories)} stories (IDs {story_ids[0]}–{story_ids[-1]}) across {page} page(s)."
+
+class AsyncFetchEngine:
+    """
+    Fetches item threads as coroutines on a private event loop. Hundreds of
+    requests can be pending at once while aiohttp caps the open connections
+    per host; parsing runs on the loop's default executor so it never stalls
+    the sockets.
+    """
+
+    max_in_flight = ASYNC_MAX_IN_FLIGHT
+
+    def __init__(self, journal: Optional[CrawlJournal] = None, archive: Optional[PageArchive] = None) -> None:
+        if aiohttp is None:
+            raise RuntimeError("The asyncio fetch engine requires aiohttp (pip install aiohttp).")
+        self.journal = journal
+        self.archive = archive
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="hn-async-fetch", daemon=True)
+        self.thread.start()
+        self.session = asyncio.run_coroutine_threadsafe(self._open_session(), self.loop).result()
+        with session_lock:
+            connection_sources.append(self.connection_counts)
+
+    async def _open_session(self) -> "aiohttp.ClientSession":
+        connector = aiohttp.TCPConnector(limit_per_host=ASYNC_CONNECTIONS_PER_HOST)
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection_created)
+        trace.on_request_start.append(self._on_request_start)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=REQUEST_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            trace_configs=[trace],
         )
 
-        with ThreadPoolExecutor(max_workers=THREAD_WORKERS) as executor:
-            for story_record, comments in executor.map(fetch_story_thread, day_stories):
-                for item in [story_record, *comments]:
-                    batch.append(item)
-                    if len(batch) >= BATCH_SIZE:
-                        filename = f"hn_html_part{batch_num}.jsonl"
-                        flush_batch(filename, batch)
-                        min_id = min(entry["id"] for entry in batch)
-                        max_id = max(entry["id"] for entry in batch)
-                        print(
-                            f"Saved batch {batch_num}: {len(batch)} items "
-                            f"(IDs {min_id}–{max_id})"
+    async def _on_connection_created(self, session: object, context: object, params: object) -> None:
+        self.connections_opened += 1
+
+    async def _on_request_start(self, session: object, context: object, params: object) -> None:
+        self.requests_sent += 1
+
+    def connection_counts(self) -> Tuple[int, int]:
+        return self.connections_opened, self.requests_sent
+
+    async def _fetch_item_page(
+        self,
+        story_id: int,
+        page: int = 1,
+        headers: Optional[Dict[str, str]] = None,
+        journal: Optional[CrawlJournal] = None,
+    ) -> Tuple[Optional[int], Optional[Union[str, bytes]]]:
+        """Return (status, body) of the last attempt; status is None if every attempt raised."""
+        url = item_url(story_id, page)
+        breaker = breakers.for_url(url)
+        status = None
+        for attempt in range(1, retry_policy.attempts + 1):
+            await breaker.acquire_async()
+            await rate_limiter.acquire_async()
+            retry_budget.deposit()
+            started = time.monotonic()
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    latency = time.monotonic() - started
+                    rate_limiter.record(response.status, latency, response.headers.get("Retry-After"))
+                    breaker.record(response.status)
+                    metrics.observe_request("item", latency)
+                    status = response.status
+                    if status == 304:
+                        return status, None
+                    if status == 200:
+                        if journal:
+                            journal.remember_validators(
+                                story_id, response.headers.get("ETag"), response.headers.get("Last-Modified")
+                            )
+                        html = await response.read() if parse_stage else await response.text()
+                        metrics.observe_bytes("item", response.content.total_bytes)
+                if status == 200:
+                    if self.archive:
+                        await self.loop.run_in_executor(
+                            None,
+                            functools.partial(self.archive.store, "item", url, html, story_id=story_id, page=page),
                         )
-                        saved_items += len(batch)
-                        batch = []
-                        batch_num += 1
-        time.sleep(FRONT_DELAY_SECONDS)
-
-    if batch:
-        filename = f"hn_html_part{batch_num}.jsonl"
-        flush_batch(filename, batch)
-        min_id = min(entry["id"] for entry in batch)
-        max_id = max(entry["id"] for entry in batch)
+                    return status, html
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                latency = time.monotonic() - started
+                rate_limiter.record(None, latency)
+                breaker.record(None)
+                metrics.observe_request("item", latency)
+                status = None
+                print(f"Thread fetch error for story {story_id} page {page} (attempt {attempt}): {exc!r}")
+            delay = retry_delay(attempt, status)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        return status, None
+
+    async def _fetch_story_thread(self, meta: Story, validators: Optional[Validators]) -> Optional[ThreadResult]:
+        status, html = await self._fetch_item_page(
+            meta.id, headers=conditional_headers(validators), journal=self.journal
+        )
+        if status == 304:
+            return None
+        if html is None:
+            raise failed_thread(meta)
+        thread = RawThreadPages() if parse_stage else new_thread_parse(meta.id)
+        await self.loop.run_in_executor(None, thread.add_page, html)
+        next_page = more_link_page(thread.more_link)
+        while next_page:
+            pages = continuation_pages(meta, thread, next_page)
+            fetched = await asyncio.gather(*(self._fetch_item_page(meta.id, page) for page in pages))
+            bodies = [body for _, body in fetched]
+            next_page = await self.loop.run_in_executor(None, add_continuation_pages, meta, thread, pages, bodies)
+        if parse_stage:
+            packed = await asyncio.wrap_future(parse_stage.submit(meta.id, thread.bodies))
+            return await self.loop.run_in_executor(None, packed_thread_records, meta, packed)
+        return await self.loop.run_in_executor(None, parsed_thread_records, meta, thread)
+
+    def submit(self, meta: Story, validators: Optional[Validators] = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._fetch_story_thread(meta, validators), self.loop)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+FETCH_ENGINES = {
+    "threads": ThreadFetchEngine,
+    "asyncio": AsyncFetchEngine,
+}
+
+
+def flush_batch(filename: str, payload: List[Record]) -> List[Tuple[int, int]]:
+    """Write a part file atomically; returns the (byte offset, length) of every line."""
+    spans: List[Tuple[int, int]] = []
+    offset = 0
+    temp_name = f"{filename}.tmp"
+    with open(temp_name, "wb") as handle:
+        for item in payload:
+            line = (record_to_json(item, kids=TREE_FORMAT == "kids") + "\n").encode("utf-8")
+            handle.write(line)
+            spans.append((offset, len(line)))
+            offset += len(line)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_name, filename)
+    return spans
+
+
+class BatchWriter:
+    """
+    Writer stage: buffers finished threads and hands every full batch to a
+    background thread, which writes it as the next numbered part file
+    (segment) while fetching carries on. Batches are cut only between
+    threads so that every thread lives in one part file, which is what lets
+    the journal treat a flushed thread as done. Within a segment threads are
+    ordered by story ID and comments by ID, and each segment is listed in
+    the directory's manifest (see hn_segments.py) and offset index (see
+    hn_index.py).
+    """
+
+    def __init__(
+        self,
+        journal: Optional[CrawlJournal] = None,
+        batch_size: Optional[int] = None,
+        directory: str = ".",
+    ) -> None:
+        self.journal = journal
+        self.batch_size = batch_size or BATCH_SIZE
+        self.directory = directory
+        self.batch_num = journal.next_batch_number() if journal else 1
+        self.threads: List[List[Record]] = []
+        self.rows = 0
+        self.saved_items = 0
+        self.manifest = SegmentManifest(directory)
+        self.manifest.sync(list_part_files(directory))
+        self.index = PartIndex(directory)
+        self.index.sync(list_part_files(directory))
+        self.pending: "queue.Queue[Optional[Tuple[int, str, List[List[Record]]]]]" = queue.Queue(
+            maxsize=WRITER_QUEUE_BATCHES
+        )
+        self.error: Optional[BaseException] = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="hn-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, items: Iterable[Record]) -> None:
+        thread = list(items)
+        self.threads.append(thread)
+        self.rows += len(thread)
+        if self.rows >= self.batch_size:
+            self.flush("Saved batch")
+
+    def flush(self, label: str, wait: bool = False) -> None:
+        """Hand the buffered threads to the writer thread; wait=True also blocks until they are on disk."""
+        self._check()
+        if self.threads:
+            self.pending.put((self.batch_num, label, self.threads))
+            self.threads = []
+            self.rows = 0
+            self.batch_num += 1
+        if wait:
+            self.pending.join()
+            self._check()
+
+    def _check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"Writing part files failed: {self.error!r}") from self.error
+
+    def _run(self) -> None:
+        while True:
+            job = self.pending.get()
+            try:
+                if job is None:
+                    return
+                if self.error is None:
+                    self._write(*job)
+            except BaseException as exc:
+                self.error = exc
+            finally:
+                self.pending.task_done()
+
+    def _write(self, batch_num: int, label: str, threads: List[List[Record]]) -> None:
+        threads.sort(key=lambda thread: thread[0].id)
+        batch: List[Record] = []
+        story_ids: List[int] = []
+        for thread in threads:
+            batch.extend((thread[0], *sorted(thread[1:], key=record_id)))
+            story_ids.extend([thread[0].id] * len(thread))
+        filename = os.path.join(self.directory, f"{PART_PREFIX}{batch_num}.jsonl")
+        spans = flush_batch(filename, batch)
+        entry = self.manifest.add(filename, ((item.id, item.time, item.type == Story.type) for item in batch))
+        self.index.add_segment(
+            filename, [(item.id, story_id, *span) for item, story_id, span in zip(batch, story_ids, spans)]
+        )
+        if self.journal:
+            self.journal.record_batch(batch_num, filename, batch)
+        metrics.batch_written(len(batch))
+        print(f"{label} {batch_num}: {len(batch)} items (IDs {entry['min_id']}–{entry['max_id']})")
+        self.saved_items += len(batch)
+
+    def close(self) -> int:
+        if not self.closed:
+            self.closed = True
+            try:
+                self.flush("Final batch", wait=True)
+            finally:
+                self.pending.put(None)
+                self.thread.join()
+                self.index.close()
+        return self.saved_items
+
+
+def record_id(record: Record) -> int:
+    return record.id
+
+
+def list_part_files(directory: str = ".") -> List[str]:
+    pattern = re.compile(rf"{PART_PREFIX}(\d+)\.jsonl$")
+    numbered = []
+    for path in glob.glob(os.path.join(directory, f"{PART_PREFIX}*.jsonl")):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            numbered.append((int(match.group(1)), path))
+    return [path for _, path in sorted(numbered)]
+
+
+def iter_part_threads(filenames: List[str]) -> Iterator[List[Record]]:
+    """Yield [story, *comments] groups; the writer always emits a story before its comments."""
+    group: List[Dict] = []
+    for filename in filenames:
+        with open(filename, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("type") == Story.type and group:
+                    yield thread_from_dicts(group)
+                    group = []
+                group.append(item)
+    if group:
+        yield thread_from_dicts(group)
+
+
+class RefreshPlan:
+    """
+    Decides which threads a refresh has to download. A thread is fetched only
+    when it is new or its front-page comment count grew past the count stored
+    in the previous part files; everything else is carried forward with the
+    front page's current score.
+    """
+
+    def __init__(self, part_files: List[str], journal: Optional[CrawlJournal]) -> None:
+        self.journal = journal
+        self.prior_descendants: Dict[int, int] = {}
+        for filename in part_files:
+            with open(filename, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    if '"type": "story"' not in line:
+                        continue
+                    item = json.loads(line)
+                    self.prior_descendants[item["id"]] = item.get("descendants") or 0
+        self.scores: Dict[int, int] = {}
+        self.fetched: Set[int] = set()
+
+    def wants(self, meta: Story) -> bool:
+        story_id = meta.id
+        self.scores[story_id] = meta.score
+        prior = self.prior_descendants.get(story_id)
+        if prior is not None and meta.descendants <= prior:
+            return False
+        self.fetched.add(story_id)
+        return True
+
+    def validators(self, story_id: int) -> Optional[Validators]:
+        if self.journal and story_id in self.prior_descendants:
+            return self.journal.validators(story_id)
+        return None
+
+    def keeps_prior(self, meta: Story, result: Optional[ThreadResult]) -> bool:
+        """A 304, or a failed re-fetch of a thread we already have, keeps the stored copy."""
+        if result is None:
+            return True
+        return meta.id in self.prior_descendants and not result[1] and meta.descendants > 0
+
+    def not_modified(self, story_id: int) -> None:
+        self.fetched.discard(story_id)
+
+    def carry_forward(self, part_files: List[str], writer: "BatchWriter") -> int:
+        carried = 0
+        for group in iter_part_threads(part_files):
+            story = group[0]
+            if story.id in self.fetched:
+                continue
+            if story.id in self.scores:
+                story.score = self.scores[story.id]
+            writer.add(group)
+            carried += 1
+        return carried
+
+
+def discover_day(
+    session: HttpSession,
+    day: datetime,
+    archive: Optional[PageArchive] = None,
+) -> Tuple[List[Story], int, bool]:
+    """Walk one day's front pages; returns (stories, pages, complete), complete=False if a page failed."""
+    page = 1
+    day_stories: List[Story] = []
+    while True:
+        html = fetch_front_page(session, day, page, archive)
+        if not html:
+            return day_stories, page, False
+        page_stories, more_link = parse_front_page(html, day)
+        if not page_stories:
+            break
+        day_stories.extend(page_stories)
+        if more_link:
+            page += 1
+        else:
+            break
+    return day_stories, page, True
+
+
+def put_until_stopped(target: queue.Queue, item: object, stop_event: threading.Event) -> bool:
+    while not stop_event.is_set():
+        try:
+            target.put(item, timeout=QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+_DISCOVERY_DONE = object()
+
+
+def discover_day_on_thread(day: datetime, archive: Optional[PageArchive] = None) -> Tuple[List[Story], int, bool]:
+    return discover_day(get_thread_session(), day, archive)
+
+
+def discover_stories(
+    executor: ThreadPoolExecutor,
+    days: List[datetime],
+    story_queue: queue.Queue,
+    stop_event: threading.Event,
+    seen: SeenStories,
+    planner: CrawlPlanner,
+    journal: Optional[CrawlJournal] = None,
+    archive: Optional[PageArchive] = None,
+    sampler: Optional[StratifiedSampler] = None,
+    refresh: Optional[RefreshPlan] = None,
+) -> None:
+    """
+    Discovery stage: fetch the front pages of up to DISCOVERY_WORKERS days at
+    once, then handle the days strictly in date order so logging, the journal
+    and which day a repeated story is credited to stay the same as a
+    day-by-day walk. Each story is pushed downstream once per run, as a
+    (priority, sequence, story) entry ordered by the planner; a sample crawl
+    keeps only the sampler's draw from each day, and a refresh only the
+    threads it has to download. A sample crawl walks the front pages of days
+    the journal has completed too, so the sampler sees the same day
+    populations, and draws the same stories, as the run that started it.
+    """
+    total_days = len(days)
+    sequence = 0
+    upcoming = iter(enumerate(days, start=1))
+    ahead: Deque[Tuple[int, datetime, Optional[Future]]] = deque()
+    try:
+        while True:
+            while len(ahead) < DISCOVERY_WORKERS:
+                entry = next(upcoming, None)
+                if entry is None:
+                    break
+                index, day = entry
+                if journal and not sampler and journal.day_completed(day.strftime("%Y-%m-%d")):
+                    ahead.append((index, day, None))
+                else:
+                    ahead.append((index, day, executor.submit(discover_day_on_thread, day, archive)))
+            if not ahead:
+                return
+            index, day, future = ahead.popleft()
+            day_label = day.strftime("%Y-%m-%d")
+            if future is None:
+                print(f"Day {index}/{total_days} ({day_label}): already in journal, skipping.")
+                metrics.day_skipped()
+                continue
+            while not future.done():
+                if stop_event.is_set():
+                    return
+                wait([future], timeout=QUEUE_POLL_SECONDS)
+            day_stories, pages, complete = future.result()
+            if stop_event.is_set():
+                return
+            if not complete:
+                # The stories found are still fetched, but the day is left
+                # unregistered so the next run walks its front pages again.
+                print(f"Day {index}/{total_days} ({day_label}): front page {pages} failed; day not journalled.")
+            if not day_stories:
+                if complete:
+                    print(f"Day {index}/{total_days} ({day_label}): no stories found.")
+                metrics.day_discovered(0)
+                continue
+            story_ids = [story.id for story in day_stories]
+            print(
+                f"Day {index}/{total_days} ({day_label}): "
+                f"{len(day_stories)} stories (IDs {story_ids[0]}–{story_ids[-1]}) across {pages} page(s) "
+                f"[rate limit {rate_limiter.describe()}]."
+            )
+            if sampler:
+                # The sampler leaves out stories an earlier day already counted, so the
+                # cross-day filter below drops no draws; the journal filter only drops
+                # this sample's own draws, saved with their weights by an earlier run.
+                day_stories = sampler.sample_day(day_label, day_stories)
+                story_ids = [story.id for story in day_stories]
+                print(f"  Sampled {len(day_stories)} of them.")
+            if journal:
+                if complete:
+                    journal.register_day(day_label, pages, story_ids)
+                fetched = journal.fetched_stories(story_ids)
+                if fetched:
+                    print(f"  {len(fetched)} of them already fetched in an earlier run.")
+                    day_stories = [story for story in day_stories if story.id not in fetched]
+            new_stories = [story for story in day_stories if seen.add(story.id)]
+            if len(new_stories) < len(day_stories):
+                print(f"  {len(day_stories) - len(new_stories)} of them already queued from another day.")
+                day_stories = new_stories
+            if refresh:
+                # Filtered before planning so the plan only counts threads that are re-fetched.
+                wanted = [story for story in day_stories if refresh.wants(story)]
+                if len(wanted) < len(day_stories):
+                    unchanged = len(day_stories) - len(wanted)
+                    print(f"  {unchanged} of them unchanged since the last crawl; carried forward.")
+                day_stories = wanted
+            metrics.day_discovered(len(day_stories))
+            skipped = planner.skipped
+            for priority, story in planner.plan(day_stories):
+                sequence += 1
+                if not put_until_stopped(story_queue, (priority, sequence, story), stop_event):
+                    return
+            if planner.skipped > skipped:
+                print(f"  {planner.skipped - skipped} of them are link posts without comments; no item request needed.")
+    finally:
+        for _, _, future in ahead:
+            if future:
+                future.cancel()
+        put_until_stopped(story_queue, (math.inf, sequence + 1, _DISCOVERY_DONE), stop_event)
+
+
+def write_thread(
+    meta: Story,
+    result: Optional[ThreadResult],
+    writer: BatchWriter,
+    refresh: Optional[RefreshPlan],
+) -> None:
+    if refresh and refresh.keeps_prior(meta, result):
+        refresh.not_modified(meta.id)
+        metrics.thread_done(0)
+        return
+    if result is None:
+        metrics.thread_done(0)
+        return
+    story_record, comments = result
+    if story_record.sample_weight is not None:
+        # A sampled story's comments stand for as many threads as the story does.
+        for comment in comments:
+            comment.sample_weight = story_record.sample_weight
+    writer.add([story_record, *comments])
+    metrics.thread_done(1 + len(comments))
+
+
+def run_pipeline(
+    days: List[datetime],
+    writer: BatchWriter,
+    engine_name: str = FETCH_ENGINE,
+    journal: Optional[CrawlJournal] = None,
+    refresh: Optional[RefreshPlan] = None,
+    archive: Optional[PageArchive] = None,
+    engine: Optional[Union[ThreadFetchEngine, AsyncFetchEngine]] = None,
+    sampler: Optional[StratifiedSampler] = None,
+) -> None:
+    """
+    Discovery, thread fetching and writing run concurrently: front pages feed a
+    bounded priority queue (largest threads first, see hn_planner.py), fetch
+    workers drain it, and finished threads are written in completion order so
+    one huge discussion never holds back the rest. A caller
+    that runs several pipelines can pass in one engine to keep its worker pool
+    and sessions alive between them.
+    """
+    owns_engine = engine is None
+    if engine is None:
+        engine = FETCH_ENGINES[engine_name](journal, archive)
+    story_queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=STORY_QUEUE_SIZE)
+    stop_event = threading.Event()
+    seen = SeenStories()
+    planner = CrawlPlanner(SKIP_EMPTY_THREADS)
+    discoverer = threading.Thread(
+        target=discover_stories,
+        args=(
+            get_discovery_executor(),
+            days,
+            story_queue,
+            stop_event,
+            seen,
+            planner,
+            None if refresh else journal,
+            archive,
+            sampler,
+            refresh,
+        ),
+        name="hn-discovery",
+        daemon=True,
+    )
+    discoverer.start()
+
+    in_flight: Dict[Future, Story] = {}
+    failed = 0
+    discovery_done = False
+    metrics.watch("story_queue", story_queue.qsize)
+    metrics.watch("in_flight", lambda: len(in_flight))
+    metrics.watch("rate_limit", lambda: round(rate_limiter.rate, 2))
+    metrics.watch("connections_opened", lambda: connection_stats()[0])
+    metrics.watch("requests_sent", lambda: connection_stats()[1])
+    metrics.watch("retry_budget", lambda: round(retry_budget.balance, 1))
+    metrics.watch("breakers_open", breakers.open_count)
+    try:
+        while not discovery_done or in_flight:
+            while not discovery_done and len(in_flight) < engine.max_in_flight:
+                try:
+                    if in_flight:
+                        _, _, meta = story_queue.get_nowait()
+                    else:
+                        _, _, meta = story_queue.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    break
+                if meta is _DISCOVERY_DONE:
+                    discovery_done = True
+                    break
+                if planner.skips(meta):
+                    write_thread(meta, thread_records(meta, "", [], []), writer, refresh)
+                elif refresh is None:
+                    in_flight[engine.submit(meta)] = meta
+                else:
+                    in_flight[engine.submit(meta, refresh.validators(meta.id))] = meta
+
+            if not in_flight:
+                continue
+            done, _ = wait(in_flight, timeout=QUEUE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                meta = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except ThreadFetchFailed:
+                    failed += 1
+                    metrics.thread_done(0)
+                    if refresh:
+                        # Keep the stored copy, if any, instead of a bare story.
+                        refresh.not_modified(meta.id)
+                    continue
+                write_thread(meta, result, writer, refresh)
+    finally:
+        stop_event.set()
+        for future in in_flight:
+            future.cancel()
+        if owns_engine:
+            engine.close()
+        discoverer.join()
+        for future, meta in in_flight.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                write_thread(meta, future.result(), writer, refresh)
+        metrics.unwatch("story_queue")
+        metrics.unwatch("in_flight")
+        seen.close()
+        if failed:
+            print(f"{failed:,} thread(s) failed after retries and were not saved; run again to fetch them.")
+        if seen.duplicates:
+            print(f"Skipped {seen.duplicates:,} repeated front-page appearance(s).")
+        if sampler:
+            print(f"Sample: {sampler.sampled:,} of {sampler.population:,} front-page stories; {sampler.describe()}.")
+        print(f"Plan: {planner.describe(rate_limiter.rate)}.")
+        print(f"Connection reuse: {describe_connection_reuse()}.")
+        print(f"Retries: {retry_budget.describe()}; circuit breakers tripped {breakers.trips()} time(s).")
+
+
+def plan_crawl(
+    days: List[datetime],
+    journal: Optional[CrawlJournal],
+    archive: Optional[PageArchive] = None,
+    sampler: Optional[StratifiedSampler] = None,
+) -> None:
+    """--dry-run: fetch only the front pages and print what the item crawl (or sample) would cost."""
+    planner = CrawlPlanner(SKIP_EMPTY_THREADS)
+    seen = SeenStories()
+    pending = [day for day in days if not (journal and journal.day_completed(day.strftime("%Y-%m-%d")))]
+    # As in discover_stories, a sample walks completed days too so its draws match the crawl's.
+    walked = days if sampler else pending
+    front_pages = 0
+    try:
+        discover = functools.partial(discover_day_on_thread, archive=archive)
+        for day, (day_stories, pages, _) in zip(walked, get_discovery_executor().map(discover, walked)):
+            front_pages += pages
+            if sampler:
+                day_stories = sampler.sample_day(day.strftime("%Y-%m-%d"), day_stories)
+            fetched = journal.fetched_stories(story.id for story in day_stories) if journal else set()
+            for _ in planner.plan(story for story in day_stories if story.id not in fetched and seen.add(story.id)):
+                pass
+    finally:
+        seen.close()
+    print(
+        f"Dry run: {len(pending)} day(s) to crawl ({len(days) - len(pending)} already in the journal), "
+        f"{front_pages} front page(s) fetched."
+    )
+    if sampler:
+        print(f"Sample: {sampler.sampled:,} of {sampler.population:,} front-page stories; {sampler.describe()}.")
+    print(f"Plan: {planner.describe(rate_limiter.rate)}.")
+
+
+def live_dataset_files() -> List[str]:
+    files = [MANIFEST_FILE, INDEX_FILE, f"{INDEX_FILE}-wal", f"{INDEX_FILE}-shm"]
+    return [*list_part_files(), *(filename for filename in files if os.path.exists(filename))]
+
+
+def sync_dataset(journal: Optional[CrawlJournal]) -> None:
+    SegmentManifest().sync(list_part_files())
+    index = PartIndex()
+    index.sync(list_part_files())
+    index.close()
+    if journal:
+        journal.rebuild_batches(list_part_files())
+
+
+def install_staged_parts(staging_dir: str, journal: Optional[CrawlJournal]) -> None:
+    """
+    Replace the current part files, manifest and offset index with the ones
+    built in a staging directory. The live set is backed up into
+    PART_BACKUP_DIR first (part files, which are never rewritten in place,
+    as hard links) and each staged file is renamed over its live name, so the
+    dataset is never missing; the backup is dropped only once the new set
+    and the journal agree. An install cut short is rolled back by
+    restore_interrupted_install() on the next run.
+    """
+    restore_interrupted_install(journal)
+    # Built under another name, so a backup cut short is never restored.
+    pending_backup = f"{PART_BACKUP_DIR}.partial"
+    shutil.rmtree(pending_backup, ignore_errors=True)
+    os.makedirs(pending_backup)
+    part_files = set(list_part_files())
+    for filename in live_dataset_files():
+        backup = os.path.join(pending_backup, os.path.basename(filename))
+        if filename in part_files:
+            try:
+                os.link(filename, backup)
+                continue
+            except OSError:  # No hard links on this filesystem.
+                pass
+        shutil.copy2(filename, backup)
+    os.rename(pending_backup, PART_BACKUP_DIR)
+    staged = [os.path.basename(path) for path in list_part_files(staging_dir)]
+    # The old index's write-ahead log must not be replayed into the staged index.
+    for filename in (f"{INDEX_FILE}-wal", f"{INDEX_FILE}-shm"):
+        if os.path.exists(filename):
+            os.remove(filename)
+    for name in [*staged, MANIFEST_FILE, INDEX_FILE]:
+        if os.path.exists(os.path.join(staging_dir, name)):
+            os.replace(os.path.join(staging_dir, name), name)
+    for path in list_part_files():
+        if os.path.basename(path) not in staged:
+            os.remove(path)
+    os.rmdir(staging_dir)
+    sync_dataset(journal)
+    shutil.rmtree(PART_BACKUP_DIR)
+
+
+def restore_interrupted_install(journal: Optional[CrawlJournal]) -> None:
+    """Put back the part files an interrupted install_staged_parts() was replacing."""
+    if not os.path.isdir(PART_BACKUP_DIR):
+        return
+    backed_up = set(os.listdir(PART_BACKUP_DIR))
+    print(f"A part-file swap was interrupted; restoring the previous part files from {PART_BACKUP_DIR}/.")
+    for filename in live_dataset_files():
+        if os.path.basename(filename) not in backed_up:
+            os.remove(filename)
+    for name in backed_up:
+        os.replace(os.path.join(PART_BACKUP_DIR, name), name)
+    # A rename onto another link to the same file leaves both links in place.
+    shutil.rmtree(PART_BACKUP_DIR)
+    sync_dataset(journal)
+
+
+def run_refresh(
+    days: List[datetime],
+    engine_name: str,
+    journal: CrawlJournal,
+    archive: Optional[PageArchive] = None,
+) -> None:
+    """
+    Rebuild the part files with an up-to-date trailing window. New and grown
+    threads are fetched into a staging directory, every other thread is
+    copied over from the old part files, and the staged set then replaces
+    the old one.
+    """
+    part_files = list_part_files()
+    if not part_files:
+        print("No existing part files to refresh; run a normal crawl first.")
+        return
+    plan = RefreshPlan(part_files, journal)
+    print(f"Refreshing {len(days)} day(s) against {len(plan.prior_descendants):,} stored stories.")
+
+    shutil.rmtree(REFRESH_STAGING_DIR, ignore_errors=True)
+    os.makedirs(REFRESH_STAGING_DIR)
+    writer = BatchWriter(directory=REFRESH_STAGING_DIR)
+    run_pipeline(days, writer, engine_name, journal, plan, archive)
+    fetched = len(plan.fetched)
+    carried = plan.carry_forward(part_files, writer)
+    writer.close()
+    install_staged_parts(REFRESH_STAGING_DIR, journal)
+    print(
+        f"REFRESH COMPLETE! {fetched:,} threads re-fetched, {carried:,} carried forward "
+        f"({writer.saved_items:,} items in {writer.batch_num - 1} part file(s))."
+    )
+
+
+def run_shard_worker(
+    days: List[datetime],
+    shard_dir: str,
+    worker_id: str,
+    engine_name: str,
+    archive: Optional[PageArchive] = None,
+    shard_days: int = SHARD_DAYS,
+    lease_seconds: float = LEASE_SECONDS,
+) -> None:
+    """
+    Crawl days leased from the shared queue into this worker's own journal and
+    part files under shard_dir/worker_id. Every lease is flushed to disk before
+    it is marked completed, so a worker that dies loses at most its current
+    lease, which another worker picks up once it expires.
+    """
+    worker_dir = os.path.join(shard_dir, worker_id)
+    os.makedirs(worker_dir, exist_ok=True)
+    work_queue = ShardQueue(os.path.join(shard_dir, QUEUE_FILE))
+    work_queue.seed(day.strftime("%Y-%m-%d") for day in days)
+    journal = CrawlJournal(os.path.join(worker_dir, JOURNAL_FILE))
+    writer = BatchWriter(journal, directory=worker_dir)
+    engine = FETCH_ENGINES[engine_name](journal, archive)
+    try:
+        while True:
+            labels = work_queue.claim(worker_id, shard_days, lease_seconds)
+            if not labels:
+                break
+            print(f"Worker {worker_id} leased {len(labels)} day(s): {labels[-1]} to {labels[0]}.")
+            metrics.add_days(len(labels))
+            heartbeat = LeaseHeartbeat(work_queue, worker_id, labels, lease_seconds).start()
+            try:
+                leased = [datetime.strptime(label, "%Y-%m-%d").date() for label in labels]
+                run_pipeline(leased, writer, engine_name, journal, archive=archive, engine=engine)
+                writer.flush("Saved batch", wait=True)
+            except BaseException:
+                work_queue.release(worker_id, labels)
+                raise
+            finally:
+                heartbeat.stop()
+            work_queue.complete(worker_id, labels)
+    finally:
+        engine.close()
+        writer.close()
+        completed, leased_days, pending = work_queue.progress()
         print(
-            f"Final batch {batch_num}: {len(batch)} items "
-            f"(IDs {min_id}–{max_id})"
+            f"Worker {worker_id}: {journal.saved_items():,} items in {worker_dir}; queue has "
+            f"{completed} completed, {leased_days} leased and {pending} pending day(s)."
         )
-        saved_items += len(batch)
+        journal.close()
+        work_queue.close()
+
+
+def run_local_shards(args: argparse.Namespace) -> List[str]:
+    """Run args.workers shard workers as child processes; returns the ids of those that failed."""
+    host = socket.gethostname()
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--shard-worker",
+        "--shard-dir",
+        args.shard_dir,
+        "--shard-days",
+        str(args.shard_days),
+        "--days",
+        str(args.days),
+        "--engine",
+        args.engine,
+        "--transport",
+        args.transport,
+        *(["--no-warm-up"] if args.no_warm_up else []),
+        "--parser",
+        args.parser,
+        *(["--fetch-empty"] if args.fetch_empty else []),
+        "--tree-format",
+        args.tree_format,
+        "--discovery-workers",
+        str(args.discovery_workers),
+        "--parse-workers",
+        str(args.parse_workers // args.workers),
+        "--metrics-interval",
+        str(args.metrics_interval),
+        "--base-url",
+        args.base_url,
+    ]
+    if args.archive:
+        command.append("--archive")
+    worker_ids = [f"{host}-{index}" for index in range(1, args.workers + 1)]
+    children = [subprocess.Popen([*command, "--worker-id", worker_id]) for worker_id in worker_ids]
+    try:
+        returncodes = [child.wait() for child in children]
+    except KeyboardInterrupt:
+        # The workers got the same SIGINT and flush their buffered threads first.
+        for child in children:
+            child.wait()
+        raise
+    return [worker_id for worker_id, code in zip(worker_ids, returncodes) if code != 0]
+
+
+def index_part_threads(filenames: List[str]) -> Dict[int, Tuple[str, int, int]]:
+    """
+    Map each story id to the (file, offset, length) of its thread. A thread
+    that appears more than once keeps its largest copy, i.e. the fullest fetch.
+    """
+    threads: Dict[int, Tuple[str, int, int]] = {}
+
+    def keep(story_id: Optional[int], filename: str, start: int, end: int) -> None:
+        if story_id is not None and end - start > threads.get(story_id, ("", 0, -1))[2]:
+            threads[story_id] = (filename, start, end - start)
+
+    for filename in filenames:
+        story_id: Optional[int] = None
+        start = offset = 0
+        with open(filename, "rb") as handle:
+            for line in handle:
+                if b'"type": "story"' in line:
+                    keep(story_id, filename, start, offset)
+                    story_id = json.loads(line)["id"]
+                    start = offset
+                offset += len(line)
+        keep(story_id, filename, start, offset)
+    return threads
 
-    print(f"DOWNLOAD COMPLETE! Total items saved: {saved_items:,}")
+
+def merge_shards(shard_dir: str, journal: CrawlJournal) -> None:
+    """
+    Combine the part files of every shard, plus any existing top-level ones,
+    into a single set ordered by story id. Duplicate threads left behind by
+    expired leases are dropped, and the shard journals are folded into the
+    main journal so later plain or --refresh runs know which days are done.
+    """
+    worker_dirs = sorted(path for path in glob.glob(os.path.join(shard_dir, "*")) if os.path.isdir(path))
+    sources = list_part_files() + [path for worker_dir in worker_dirs for path in list_part_files(worker_dir)]
+    if not sources:
+        print(f"No part files under {shard_dir}/ to merge.")
+        return
+    threads = index_part_threads(sources)
+
+    shutil.rmtree(MERGE_STAGING_DIR, ignore_errors=True)
+    os.makedirs(MERGE_STAGING_DIR)
+    writer = BatchWriter(directory=MERGE_STAGING_DIR)
+    current_file: Optional[str] = None
+    handle = None
+    try:
+        for story_id in sorted(threads):
+            filename, offset, length = threads[story_id]
+            if filename != current_file:
+                if handle:
+                    handle.close()
+                handle = open(filename, "rb")
+                current_file = filename
+            handle.seek(offset)
+            lines = handle.read(length).decode("utf-8").splitlines()
+            writer.add(thread_from_dicts([json.loads(line) for line in lines if line.strip()]))
+    finally:
+        if handle:
+            handle.close()
+    writer.close()
+    install_staged_parts(MERGE_STAGING_DIR, journal)
+    for worker_dir in worker_dirs:
+        shard_journal = os.path.join(worker_dir, JOURNAL_FILE)
+        if os.path.exists(shard_journal):
+            journal.merge_days(shard_journal)
+    print(
+        f"MERGE COMPLETE! {len(threads):,} threads from {len(sources)} part file(s) "
+        f"({writer.saved_items:,} items in {writer.batch_num - 1} part file(s))."
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape ~200 days of Hacker News front pages and threads.")
+    parser.add_argument(
+        "--engine",
+        choices=sorted(FETCH_ENGINES),
+        default=FETCH_ENGINE,
+        help="item fetch engine: a thread pool of requests sessions, or aiohttp on an event loop",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=HTTP_TRANSPORTS,
+        default=HTTP_TRANSPORT,
+        help=f"requests sessions per thread (HTTP/1.1), or {HTTP2_CLIENTS} shared multiplexed HTTP/2 clients (needs httpx[http2])",
+    )
+    parser.add_argument(
+        "--no-warm-up",
+        action="store_true",
+        help="skip the one homepage request made before the first front page",
+    )
+    parser.add_argument(
+        "--discovery-workers",
+        type=int,
+        default=DISCOVERY_WORKERS,
+        help="days whose front pages are fetched at once (all requests share the rate limit)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSER_BACKENDS),
+        default=DEFAULT_PARSER_BACKEND,
+        help="HTML parser backend (lxml is used when installed)",
+    )
+    parser.add_argument(
+        "--fetch-empty",
+        action="store_true",
+        help="also fetch the item pages of link posts without comments (normally skipped; only their text is lost)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="fetch only the front pages and print the planned item requests and estimated runtime",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=0,
+        metavar="STORIES",
+        help=f"crawl a stratified sample of at most this many stories into {SAMPLE_DIR}/, each record "
+        "tagged with its sample_weight (see hn_sampling.py)",
+    )
+    parser.add_argument(
+        "--sample-days",
+        type=int,
+        default=0,
+        help="days drawn for --sample, stratified by weekday (default: four of each weekday)",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="seed of the --sample draws; change it (with --fresh) for a different sample",
+    )
+    parser.add_argument(
+        "--tree-format",
+        choices=TREE_FORMATS,
+        default=TREE_FORMAT,
+        help="write each record's kids array, or only parent and depth (smaller part files, same tree)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=PARSE_WORKERS,
+        help="worker processes for parsing item pages; 0 (default) streams them through the constant-memory "
+        "parser on the fetch threads, more trades memory for parsing on several cores",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DAYS_OF_HISTORY,
+        help="number of days to walk back from today",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="re-fetch only threads that are new or whose comment count grew since the existing part files",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help=f"keep a compressed copy of every fetched page in {ARCHIVE_DIR}/ for reparse_hn_archive.py",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=METRICS_INTERVAL_SECONDS,
+        help="seconds between metrics snapshots and progress lines (0 disables them)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=BASE_NEWS_URL,
+        help="site to crawl; point it at mock_hn_server.py for load tests",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help=f"discard {JOURNAL_FILE} and start again from day 1 and part 1 (with --workers, also clears --shard-dir)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="crawl with this many shard worker processes sharing a lease queue, then merge their part files",
+    )
+    parser.add_argument(
+        "--shard-worker",
+        action="store_true",
+        help="run one shard worker against the queue in --shard-dir (start one per process or machine)",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        action="store_true",
+        help="merge the part files of all shard workers into ID-ordered part files here",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        default=SHARD_DIR,
+        help="shared directory holding the lease queue and each worker's journal and part files",
+    )
+    parser.add_argument(
+        "--shard-days",
+        type=int,
+        default=SHARD_DAYS,
+        help="days a shard worker leases at a time",
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="name of this shard worker and of its directory under --shard-dir",
+    )
+    args = parser.parse_args()
+    sharded = args.workers > 1 or args.shard_worker or args.merge_shards
+    if args.refresh and sharded:
+        parser.error("--refresh runs on the merged part files; merge the shards first")
+    if args.shard_worker and args.fresh:
+        parser.error("--fresh would discard other workers' progress; clear --shard-dir instead")
+    if args.transport == "http2" and args.engine == "asyncio":
+        parser.error("--transport http2 applies to the threads engine; aiohttp only speaks HTTP/1.1")
+    if args.sample and (sharded or args.refresh):
+        parser.error("--sample runs a single-process crawl; drop --workers/--shard-worker/--merge-shards/--refresh")
+    if args.sample < 0 or args.sample_days < 0:
+        parser.error("--sample and --sample-days cannot be negative")
+    if args.dry_run and (sharded or args.refresh):
+        parser.error("--dry-run estimates a plain crawl; drop --workers/--shard-worker/--merge-shards/--refresh")
+    if args.shard_worker and args.merge_shards:
+        parser.error("run --merge-shards once all shard workers have finished")
+    if args.workers < 1 or args.shard_days < 1:
+        parser.error("--workers and --shard-days must be at least 1")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    configure_base_url(args.base_url)
+    configure_transport(args.transport, not args.no_warm_up)
+    configure_discovery(args.discovery_workers)
+    configure_tree_format(args.tree_format)
+    configure_planner(args.fetch_empty)
+    set_parser_backend(args.parser)
+    end_date = datetime.now(timezone.utc).date()
+    start_date = end_date - timedelta(days=args.days - 1)
+    total_days = (end_date - start_date).days + 1
+    days = list(daterange(end_date, total_days))
+    sampler = None
+    directory = "."
+    if args.sample:
+        sampler = StratifiedSampler(args.sample, args.sample_days, args.sample_seed)
+        days = sampler.sample_days(days)
+        directory = SAMPLE_DIR
+        print(f"Sampling {len(days)} of {total_days} day(s) into {SAMPLE_DIR}/: {sampler.describe()}.")
+
+    if args.workers > 1 and not args.shard_worker:
+        if args.fresh:
+            shutil.rmtree(args.shard_dir, ignore_errors=True)
+        print(f"Crawling {len(days)} day(s) with {args.workers} shard workers under {args.shard_dir}/.")
+        try:
+            failed = run_local_shards(args)
+        except KeyboardInterrupt:
+            print("Interrupted: run again with the same --workers to resume.")
+            raise SystemExit(130)
+        if failed:
+            print(f"Shard worker(s) {', '.join(failed)} failed; rerun to finish their days before merging.")
+            raise SystemExit(1)
+        args.merge_shards = True
+    if args.merge_shards and not args.shard_worker:
+        journal = CrawlJournal(fresh=args.fresh)
+        restore_interrupted_install(journal)
+        merge_shards(args.shard_dir, journal)
+        journal.close()
+        return
+
+    archive = PageArchive() if args.archive else None
+    if args.shard_worker:
+        worker_dir = os.path.join(args.shard_dir, args.worker_id)
+        os.makedirs(worker_dir, exist_ok=True)
+        start_parse_stage(args.parse_workers, args.parser)
+        metrics.start_reporter(args.metrics_interval, worker_dir)
+        try:
+            run_shard_worker(days, args.shard_dir, args.worker_id, args.engine, archive, args.shard_days)
+        except KeyboardInterrupt:
+            print(f"Worker {args.worker_id} interrupted: its unfinished days were handed back to the queue.")
+            raise SystemExit(130)
+        finally:
+            stop_parse_stage()
+            metrics.stop_reporter(worker_dir)
+        return
+
+    if args.dry_run:
+        # With --fresh the estimate ignores the journal instead of discarding it.
+        journal_file = os.path.join(directory, JOURNAL_FILE)
+        journal = None if args.fresh or not os.path.exists(journal_file) else CrawlJournal(journal_file)
+        plan_crawl(days, journal, archive, sampler)
+        if journal:
+            journal.close()
+        return
+    if sampler:
+        if args.fresh:
+            shutil.rmtree(SAMPLE_DIR, ignore_errors=True)
+        os.makedirs(SAMPLE_DIR, exist_ok=True)
+    journal = CrawlJournal(os.path.join(directory, JOURNAL_FILE), fresh=args.fresh)
+    if directory == ".":
+        restore_interrupted_install(journal)
+    start_parse_stage(args.parse_workers, args.parser)
+    metrics.set_days(len(days))
+    metrics.start_reporter(args.metrics_interval, directory)
+    if args.refresh:
+        run_refresh(days, args.engine, journal, archive)
+        metrics.stop_reporter()
+        stop_parse_stage()
+        journal.close()
+        return
+
+    resumed = journal.summary()
+    if resumed:
+        print(f"Resuming from {JOURNAL_FILE}: {resumed}.")
+    writer = BatchWriter(journal, directory=directory)
+    try:
+        run_pipeline(days, writer, args.engine, journal, archive=archive, sampler=sampler)
+    except KeyboardInterrupt:
+        print("Interrupted: flushing buffered threads before exit. Run again to resume.")
+        stop_parse_stage()
+        writer.close()
+        metrics.stop_reporter(directory)
+        journal.close()
+        raise SystemExit(130)
+    stop_parse_stage()
+    writer.close()
+    metrics.stop_reporter(directory)
+    total_saved = journal.saved_items()
+    journal.close()
+
+    print(f"DOWNLOAD COMPLETE! Total items saved: {total_saved:,}")
 
 
 if __name__ == "__main__":
     main()
-
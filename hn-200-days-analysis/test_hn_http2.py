@@ -0,0 +1,83 @@
+"""
+Check the httpx-backed transport (hn_http2.py) against mock_hn_server.py.
+
+The mock site speaks plain-text HTTP/1.1, so httpx falls back from HTTP/2;
+what is exercised is the requests-compatible surface the crawler relies on.
+Skipped when httpx is not installed.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+import requests
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+from hn_http2 import Http2Session
+from mock_hn_server import MockConfig, MockHNServer
+
+CRAWLER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrape_hn_200_days.py")
+HEADERS = {"User-Agent": "hn-http2-test"}
+
+
+@pytest.fixture
+def server():
+    server = MockHNServer(MockConfig(pages_per_day=1, comments_per_page=20)).start()
+    yield server
+    server.stop()
+
+
+def test_get_matches_requests(server):
+    session = Http2Session(HEADERS, timeout=5)
+    try:
+        response = session.get(f"{server.url}/front", params={"day": "2024-01-02"})
+        expected = requests.get(f"{server.url}/front", params={"day": "2024-01-02"}, timeout=5)
+        assert response.status_code == 200
+        assert response.text == expected.text
+        assert response.url.startswith(f"{server.url}/front?day=2024-01-02")
+        assert response.raw.tell() == len(expected.content)
+    finally:
+        session.close()
+
+
+def test_streamed_body_and_connection_reuse(server):
+    session = Http2Session(HEADERS, timeout=5)
+    try:
+        whole = session.get(f"{server.url}/item?id=1").text
+        with session.get(f"{server.url}/item?id=1", stream=True) as response:
+            streamed = "".join(response.iter_content(chunk_size=1024, decode_unicode=True))
+            assert response.raw.tell() == len(streamed.encode("utf-8"))
+        assert streamed == whole
+        assert session.connection_counts() == (1, 2)
+    finally:
+        session.close()
+
+
+def test_errors_are_requests_exceptions():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    session = Http2Session(HEADERS, timeout=2)
+    try:
+        with pytest.raises(requests.ConnectionError):
+            session.get(f"http://127.0.0.1:{port}/front")
+    finally:
+        session.close()
+
+
+def test_crawl_with_http2_transport(server, tmp_path):
+    result = subprocess.run(
+        [sys.executable, CRAWLER, "--base-url", server.url, "--days", "1", "--transport", "http2",
+         "--metrics-interval", "0"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "DOWNLOAD COMPLETE!" in result.stdout
+    assert list(tmp_path.glob("hn_html_part*.jsonl"))
@@ -0,0 +1,115 @@
+"""
+Check that the parser backends (hn_parsing.py) store the same records,
+including comment HTML in HN's unclosed-<p> markup, both for hand-written
+pages and for multi-page threads from mock_hn_server.py. The lxml backends
+are skipped when lxml is not installed.
+"""
+
+from datetime import datetime
+
+import pytest
+
+import hn_parsing
+from hn_parsing import (
+    PARSER_BACKENDS,
+    RawThreadPages,
+    html_parser_markup,
+    new_thread_parse,
+    parse_item_pages,
+    set_parser_backend,
+)
+from mock_hn_server import MockConfig, SyntheticSite
+
+BODIES = [
+    "one<p>two<p>three",
+    'See <a href="https://example.com/?a=1&amp;b=2" rel="nofollow">example.com</a><p>It&#x27;s &lt;b&gt; &amp; more',
+    "intro<p><pre><code>  if a &lt; b:\n    x = &quot;y&quot;\n</code></pre>after<p><i>italic</i> end",
+    "single paragraph",
+]
+
+
+def item_page(body: str) -> str:
+    rows = "".join(
+        f'<tr class="athing comtr" id="{comment_id}"><td><table><tr>'
+        f'<td class="ind"><img src="s.gif" height="1" width="{40 * depth}"></td>'
+        f'<td class="default"><div><a class="hnuser">user{comment_id}</a> '
+        f'<span class="age" title="2024-01-02T03:04:05"><a>1 hour ago</a></span></div>'
+        f'<div class="comment"><span class="commtext c00">{body}</span>'
+        f'<div class="reply"><p><font size="1"><u><a href="reply?id={comment_id}">reply</a></u></font></p></div>'
+        "</div></td></tr></table></td></tr>"
+        for comment_id, depth in ((11, 0), (12, 1), (13, 0))
+    )
+    return (
+        '<html><body><table class="fatitem"><tr><td><span class="commtext">'
+        f"{body}</span></td></tr></table>"
+        f'<table class="comment-tree">{rows}</table></body></html>'
+    )
+
+
+def parse_with(backend: str, body: str):
+    return parse_pages_with(backend, [item_page(body)], 1)
+
+
+def parse_pages_with(backend: str, pages, story_id: int):
+    if backend != "bs4":
+        pytest.importorskip("lxml")
+    set_parser_backend(backend)
+    try:
+        story_text, comments, story_kids = parse_item_pages(pages, story_id)
+    finally:
+        set_parser_backend(hn_parsing.DEFAULT_PARSER_BACKEND)
+    return story_text, sorted((comment.to_dict() for comment in comments), key=lambda item: item["id"]), story_kids
+
+
+@pytest.mark.parametrize("backend", [name for name in PARSER_BACKENDS if name != "bs4"])
+@pytest.mark.parametrize("body", BODIES)
+def test_backends_store_the_same_records(backend, body):
+    assert parse_with(backend, body) == parse_with("bs4", body)
+
+
+@pytest.mark.parametrize("backend", [name for name in PARSER_BACKENDS if name != "bs4"])
+def test_backends_agree_on_mock_threads(backend):
+    site = SyntheticSite(MockConfig(comments_per_page=40))
+    story_ids = site.story_ids(datetime(2024, 1, 2), 1)
+    threads = [story_id for story_id in story_ids if site.story(story_id)["comments"] > 40]
+    assert threads
+    for story_id in threads[:3]:
+        pages = [site.item_page(story_id, page) for page in (1, 2, 3)]
+        expected = parse_pages_with("bs4", pages, story_id)
+        assert any("<p>" in comment["text"] for comment in expected[1])
+        assert parse_pages_with(backend, pages, story_id) == expected
+
+
+def test_multi_paragraph_comment_uses_html_parser_markup():
+    story_text, comments, _ = parse_with("bs4", "one<p>two<p>three")
+    assert story_text == "one<p>two<p>three</p></p>"
+    assert {comment["text"] for comment in comments} == {"one<p>two<p>three</p></p>"}
+
+
+def test_html_parser_markup_rewrites_libxml2_output():
+    assert html_parser_markup("one<p>two</p><p>three</p>") == "one<p>two<p>three</p></p>"
+    assert html_parser_markup("a<br>b<p>c</p>") == "a<br/>b<p>c</p>"
+    assert html_parser_markup("one<p>two<p>three</p></p>") == "one<p>two<p>three</p></p>"
+
+
+MARKUP_VARIANTS = [
+    ('<tr class="athing comtr" id="1">', '<a href="item?id=9&amp;p=2" class="morelink" rel="next">More</a>'),
+    ("<tr class='comtr athing' id='1'>", "<a rel='next' class='morelink' href='item?id=9&amp;p=2'>More</a>"),
+    ("<tr id=1 class=comtr>", "<a class=morelink href=item?id=9&amp;p=2>More</a>"),
+    (
+        '<TR CLASS="athing  comtr" title="a > b" ID="1">',
+        '<a title="next >" class="morelink next" href="item?id=9&amp;p=2">More</a>',
+    ),
+]
+
+
+@pytest.mark.parametrize("row, more", MARKUP_VARIANTS)
+def test_raw_pages_find_what_the_parser_finds(row, more):
+    cell = '<td class="default"><span class="commtext c00">hi</span></td>'
+    rows = f'{row}{cell}</tr>{row.replace("1", "2")}{cell}</tr>'
+    body = f'<html><body><table class="comment-tree">{rows}</table>{more}</body></html>'
+    raw = RawThreadPages()
+    raw.add_page(body.encode())
+    thread = new_thread_parse(9)
+    thread.add_page(body)
+    assert (raw.comment_count, raw.more_link) == (thread.comment_count, thread.more_link) == (2, "item?id=9&p=2")
@@ -0,0 +1,63 @@
+"""
+Check that threads from part files written before the thread metrics
+(hn_records.thread_from_dicts) come back with the metrics a fresh parse gives.
+"""
+
+from datetime import datetime
+
+from hn_parsing import parse_item_pages
+from hn_records import thread_from_dicts
+from mock_hn_server import MockConfig, SyntheticSite
+
+
+def parsed_thread():
+    site = SyntheticSite(MockConfig(comments_per_page=1000))
+    story_id = next(
+        story_id for story_id in site.story_ids(datetime(2024, 1, 2), 1) if site.story(story_id)["comments"] > 30
+    )
+    meta = site.story(story_id)
+    story = {
+        "id": story_id,
+        "type": "story",
+        "title": meta["title"],
+        "url": meta["url"],
+        "by": meta["by"],
+        "time": meta["time"],
+        "score": meta["score"],
+    }
+    story_text, comments, story_kids = parse_item_pages([site.item_page(story_id, 1)], story_id)
+    story.update(text=story_text, descendants=len(comments), kids=story_kids)
+    story["max_depth"] = max(comment.depth for comment in comments)
+    top_level = [comment.time for comment in comments if comment.depth == 1]
+    story["reply_latency"] = min(top_level) - meta["time"]
+    return [story, *sorted((comment.to_dict() for comment in comments), key=lambda item: item["id"])]
+
+
+def baseline_layout(items):
+    """The same thread as the original crawler wrote it: no depth or latency, direct replies as descendants."""
+    legacy = []
+    for item in items:
+        item = {key: value for key, value in item.items() if key not in ("depth", "reply_latency", "max_depth")}
+        if item["type"] == "comment":
+            item["descendants"] = len(item["kids"])
+        legacy.append(item)
+    return legacy
+
+
+def test_legacy_thread_metrics_are_rebuilt():
+    items = parsed_thread()
+    rebuilt = [record.to_dict() for record in thread_from_dicts(baseline_layout(items))]
+    assert rebuilt == items
+
+
+def test_current_threads_are_read_unchanged():
+    items = parsed_thread()
+    assert [record.to_dict() for record in thread_from_dicts(items)] == items
+
+
+def test_unreachable_comment_keeps_null_depth():
+    items = baseline_layout(parsed_thread())
+    orphan = dict(items[-1], id=1, parent=2, kids=[])
+    records = thread_from_dicts([*items, orphan])
+    assert records[-1].depth is None
+    assert all(record.depth is not None for record in records[1:-1])
@@ -0,0 +1,66 @@
+"""
+Check that replacing the part files with a staged set (refresh, merge and
+reparse all do) never leaves the dataset missing, even when cut short.
+"""
+
+import json
+import os
+
+import pytest
+
+import scrape_hn_200_days as crawler
+
+
+def write_part(directory: str, number: int, story_id: int) -> None:
+    item = {"id": story_id, "type": "story", "title": f"story {story_id}", "time": 1704153600 + story_id}
+    with open(os.path.join(directory, f"{crawler.PART_PREFIX}{number}.jsonl"), "w", encoding="utf-8") as handle:
+        handle.write(json.dumps(item) + "\n")
+
+
+def dataset() -> dict:
+    parts = {}
+    for path in crawler.list_part_files():
+        with open(path, encoding="utf-8") as handle:
+            parts[os.path.basename(path)] = handle.read()
+    return parts
+
+
+@pytest.fixture
+def live_and_staged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for number in (1, 2, 3):
+        write_part(".", number, number)
+    crawler.sync_dataset(None)
+    os.makedirs("staging")
+    for number in (1, 2):
+        write_part("staging", number, 100 + number)
+    return dataset()
+
+
+def test_install_replaces_the_live_set(live_and_staged):
+    crawler.install_staged_parts("staging", None)
+    assert sorted(dataset()) == [f"{crawler.PART_PREFIX}1.jsonl", f"{crawler.PART_PREFIX}2.jsonl"]
+    assert '"id": 101' in dataset()[f"{crawler.PART_PREFIX}1.jsonl"]
+    assert not os.path.exists(crawler.PART_BACKUP_DIR)
+    assert not os.path.exists("staging")
+
+
+def test_interrupted_install_is_rolled_back(live_and_staged, monkeypatch):
+    real_replace = os.replace
+    calls = []
+
+    def failing_replace(source, target):
+        calls.append(target)
+        if len(calls) > 1:
+            raise OSError(28, "No space left on device")
+        real_replace(source, target)
+
+    monkeypatch.setattr(crawler.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        crawler.install_staged_parts("staging", None)
+    monkeypatch.setattr(crawler.os, "replace", real_replace)
+
+    assert os.path.isdir(crawler.PART_BACKUP_DIR)
+    crawler.restore_interrupted_install(None)
+    assert dataset() == live_and_staged
+    assert not os.path.exists(crawler.PART_BACKUP_DIR)
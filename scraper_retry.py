@@ -0,0 +1,221 @@
+"""
+The single retry layer shared by the HTTP scrapers: a retry budget and
+per-host circuit breakers.
+
+Every request deposits RETRY_BUDGET_RATIO of a token into a shared budget
+and every retry spends a whole one, so retries can never exceed about 10% of
+the traffic however many URLs fail at once. A small reserve lets the first
+few failures of a run retry before the budget has built up. A circuit
+breaker per host opens after a run of consecutive 403/429 responses and
+holds every request to that host for a cool-down. Once the cool-down ends,
+a single probe request is let through: success closes the breaker, and
+another throttle reopens it for twice as long.
+
+The HN crawler drives RetryPolicy and the breakers from its own fetch loops;
+the simpler scrapers call get_with_retries(). Scripts in the platform
+directories import this module from the repository root.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+RETRY_ATTEMPTS = 3
+RETRY_STATUSES = (403, 429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (403, 429)
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_RESERVE = 10.0
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+BREAKER_MAX_COOLDOWN_SECONDS = 600.0
+BREAKER_PROBE_POLL_SECONDS = 0.5
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, reserve: float = RETRY_BUDGET_RESERVE) -> None:
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = reserve
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self.lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Credit one request (first attempt or retry) to the budget."""
+        with self.lock:
+            self.requests += 1
+            self.balance += self.ratio
+
+    def withdraw(self) -> bool:
+        """Spend one retry; False when the budget is exhausted."""
+        with self.lock:
+            if self.balance < 1.0:
+                self.denied += 1
+                return False
+            self.balance -= 1.0
+            self.retries += 1
+            return True
+
+    def describe(self) -> str:
+        share = self.retries / self.requests * 100 if self.requests else 0.0
+        return f"{self.retries:,} retries in {self.requests:,} requests ({share:.1f}%), {self.denied:,} denied by the budget"
+
+
+class RetryPolicy:
+    """Which failures are retried, how often, and how long to back off first."""
+
+    def __init__(self, budget: RetryBudget, attempts: int = RETRY_ATTEMPTS) -> None:
+        self.budget = budget
+        self.attempts = attempts
+
+    def backoff(self, attempt: int, status: Optional[int]) -> Optional[float]:
+        """
+        Seconds to wait before retrying after `attempt` (1-based) failed with
+        `status` (None for a connection error), or None to give up.
+        """
+        if status is not None and status not in RETRY_STATUSES:
+            return None
+        if attempt >= self.attempts or not self.budget.withdraw():
+            return None
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN_SECONDS,
+    ) -> None:
+        self.host = host
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.throttled = 0
+        self.opened_until = 0.0
+        self.probing = False
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Seconds the caller must wait before sending; 0 means go (possibly as the probe)."""
+        with self.lock:
+            if self.state == "closed":
+                return 0.0
+            now = time.monotonic()
+            if now < self.opened_until:
+                return self.opened_until - now
+            if self.probing:
+                return BREAKER_PROBE_POLL_SECONDS
+            self.state = "half-open"
+            self.probing = True
+            return 0.0
+
+    def acquire(self) -> None:
+        while True:
+            delay = self.reserve()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        while True:
+            delay = self.reserve()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def record(self, status: Optional[int]) -> None:
+        with self.lock:
+            if status is None:
+                # A connection error says nothing about throttling; let another request probe.
+                self.probing = False
+                return
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                if self.state == "half-open":
+                    self.cooldown = min(BREAKER_MAX_COOLDOWN_SECONDS, self.cooldown * 2)
+                    self._open()
+                elif self.state == "closed" and self.throttled >= self.threshold:
+                    self._open()
+                return
+            self.throttled = 0
+            if self.state == "half-open":
+                self.state = "closed"
+                self.probing = False
+                self.cooldown = self.base_cooldown
+                print(f"Circuit breaker for {self.host}: probe succeeded, resuming.")
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.probing = False
+        self.opened_until = time.monotonic() + self.cooldown
+        self.trips += 1
+        print(f"Circuit breaker for {self.host}: {self.throttled} throttled responses, pausing {self.cooldown:.0f}s.")
+
+
+class HostBreakers:
+    """One CircuitBreaker per host, created on first use."""
+
+    def __init__(self) -> None:
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(host)
+            return breaker
+
+    def open_count(self) -> int:
+        with self.lock:
+            return sum(breaker.state != "closed" for breaker in self.breakers.values())
+
+    def trips(self) -> int:
+        with self.lock:
+            return sum(breaker.trips for breaker in self.breakers.values())
+
+
+def get_with_retries(
+    session: requests.Session,
+    url: str,
+    policy: RetryPolicy,
+    breakers: HostBreakers,
+    timeout: float = 15,
+    **kwargs,
+) -> requests.Response:
+    """
+    GET through the host's circuit breaker, retrying throttles, server errors
+    and connection failures with jittered backoff while the budget allows.
+    Returns the last response; re-raises the last connection error.
+    """
+    breaker = breakers.for_url(url)
+    attempt = 1
+    while True:
+        breaker.acquire()
+        policy.budget.deposit()
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            breaker.record(None)
+            delay = policy.backoff(attempt, None)
+            if delay is None:
+                raise
+        else:
+            breaker.record(response.status_code)
+            delay = policy.backoff(attempt, response.status_code)
+            if delay is None:
+                return response
+        time.sleep(delay)
+        attempt += 1